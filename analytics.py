@@ -0,0 +1,142 @@
+"""Cross-game leaderboard and play statistics.
+
+Aggregates live in the event store's database and are folded forward by
+the store's writer thread, in the same transaction as the events they
+come from, so they never disagree with the log. Each batch touches one
+row per tool, scenario and counter it mentions; final standings go into
+a table indexed by score. Every dashboard query therefore reads a handful
+of rows, however many turns have been recorded.
+"""
+import json
+from collections import Counter
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analytics_totals (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tool_stats (
+    tool TEXT PRIMARY KEY,
+    picks INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS scenario_stats (
+    scenario TEXT PRIMARY KEY,
+    turns INTEGER NOT NULL,
+    total_points INTEGER NOT NULL,
+    tokens INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS final_scores (
+    game_id TEXT NOT NULL,
+    player INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    final_score INTEGER NOT NULL,
+    tokens INTEGER NOT NULL,
+    finished_at REAL NOT NULL,
+    PRIMARY KEY (game_id, player)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS final_scores_by_score ON final_scores (final_score DESC, finished_at);
+"""
+
+Event = Tuple[str, int, str, Dict[str, Any], float]
+
+@dataclass(frozen=True)
+class LeaderboardEntry:
+    name: str
+    final_score: int
+    tokens: int
+    game_id: str
+    finished_at: float
+
+@dataclass(frozen=True)
+class ToolStats:
+    tool: str
+    picks: int
+    pick_rate: float
+
+@dataclass(frozen=True)
+class ScenarioStats:
+    scenario: str
+    turns: int
+    average_total: float
+    token_rate: float
+
+def fold(conn, events: Iterable[Event]) -> None:
+    """Add a batch of (game_id, seq, kind, payload, created_at) events to the aggregates."""
+    totals: Counter = Counter()
+    picks: Counter = Counter()
+    scenarios: Dict[str, List[int]] = {}
+    finals = []
+    for game_id, seq, kind, payload, created_at in events:
+        if kind == "start":
+            totals["games_started"] += 1
+        elif kind == "add_round_score":
+            totals["turns"] += 1
+            picks.update(payload["tools"])
+            row = scenarios.setdefault(payload["scenario"], [0, 0, 0])
+            row[0] += 1
+            row[1] += payload["total"]
+        elif kind == "add_token":
+            totals["tokens"] += 1
+            scenarios.setdefault(payload["scenario"], [0, 0, 0])[2] += 1
+        elif kind == "advance" and payload.get("standings"):
+            totals["games_finished"] += 1
+            finals += [(game_id, i, name, score, tokens, created_at) for i, (name, score, tokens) in enumerate(payload["standings"])]
+    conn.executemany("INSERT INTO analytics_totals VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = value + excluded.value", totals.items())
+    conn.executemany("INSERT INTO tool_stats VALUES (?, ?) ON CONFLICT(tool) DO UPDATE SET picks = picks + excluded.picks", picks.items())
+    conn.executemany(
+        "INSERT INTO scenario_stats VALUES (?, ?, ?, ?) ON CONFLICT(scenario) DO UPDATE SET "
+        "turns = turns + excluded.turns, total_points = total_points + excluded.total_points, tokens = tokens + excluded.tokens",
+        [(name, *row) for name, row in scenarios.items()],
+    )
+    conn.executemany("INSERT OR REPLACE INTO final_scores VALUES (?, ?, ?, ?, ?, ?)", finals)
+
+def rebuild(conn, chunk_size: int = 10_000) -> None:
+    """Recompute every aggregate from the event log, for databases that predate them."""
+    for table in ("analytics_totals", "tool_stats", "scenario_stats", "final_scores"):
+        conn.execute(f"DELETE FROM {table}")
+    cursor = conn.execute("SELECT game_id, seq, kind, payload, created_at FROM events")
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        fold(conn, [(game_id, seq, kind, json.loads(payload), created_at) for game_id, seq, kind, payload, created_at in rows])
+
+def ensure_schema(conn) -> None:
+    conn.executescript(SCHEMA)
+    has_events = conn.execute("SELECT 1 FROM events LIMIT 1").fetchone()
+    has_totals = conn.execute("SELECT 1 FROM analytics_totals LIMIT 1").fetchone()
+    if has_events and not has_totals:
+        with conn:
+            rebuild(conn)
+
+class Analytics:
+    """Read side of the aggregates kept by an ``EventStore``."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def _query(self, sql: str, args: tuple = ()) -> list:
+        self.store.flush(timeout=1.0)
+        with closing(self.store.connect()) as conn:
+            return conn.execute(sql, args).fetchall()
+
+    def totals(self) -> Dict[str, int]:
+        totals = dict.fromkeys(("games_started", "games_finished", "turns", "tokens"), 0)
+        totals.update(self._query("SELECT key, value FROM analytics_totals"))
+        return totals
+
+    def top_scores(self, k: int = 10) -> List[LeaderboardEntry]:
+        rows = self._query("SELECT name, final_score, tokens, game_id, finished_at FROM final_scores ORDER BY final_score DESC, finished_at LIMIT ?", (k,))
+        return [LeaderboardEntry(*row) for row in rows]
+
+    def tool_stats(self) -> List[ToolStats]:
+        turns = self.totals()["turns"]
+        rows = self._query("SELECT tool, picks FROM tool_stats ORDER BY picks DESC, tool")
+        return [ToolStats(tool, picks, picks / turns if turns else 0.0) for tool, picks in rows]
+
+    def scenario_stats(self) -> List[ScenarioStats]:
+        rows = self._query("SELECT scenario, turns, total_points, tokens FROM scenario_stats ORDER BY scenario")
+        return [ScenarioStats(name, turns, total / turns if turns else 0.0, tokens / turns if turns else 0.0) for name, turns, total, tokens in rows]
@@ -0,0 +1,320 @@
+"""Concurrent-session load test of app.py on one Streamlit server.
+
+    python -m benchmarks.load --sessions 200 --players 6 --rounds 9 \
+        --concurrency 10 50 100 200
+
+Starts ``streamlit run app.py`` (or uses the server at ``--url``) and
+plays every session against it over Streamlit's websocket protocol, as
+browsers do: each session loads the app, sets the player and round
+sliders, clicks Start Game, then for every turn picks one to three tools,
+clicks Play These Tools, types a reflection and clicks Submit & Continue
+until the game-over screen. Widget changes inside a fragment rerun only
+that fragment, as they do in the browser. All sessions share the
+server's caches, catalog, PlayIndex and event store writer, so the
+numbers include their contention.
+
+For each concurrency level a fresh server is started, the sessions wait
+on a barrier and click Start Game together, reproducing the start of a
+class. The report gives p50/p95/p99 rerun latency overall and per action
+(measured from sending the rerun to its script_finished message), reruns
+per second, and the server's peak resident memory. With ``--url`` the
+server is shared across levels and its memory is not reported.
+
+The client is one asyncio process that needs the ``websockets`` package
+and speaks the widget-state encoding of the installed Streamlit version.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+ACTIONS = ("load", "setup", "start_game", "select", "play", "submit")
+BARRIER_TIMEOUT = 300
+RERUN_TIMEOUT = 120
+SERVER_START_TIMEOUT = 60
+WIDGET_TYPES = ("button", "slider", "selectbox", "text_area", "text_input", "checkbox", "multiselect", "download_button")
+
+class SessionError(RuntimeError):
+    pass
+
+class Session:
+    """One browser tab: a websocket plus the elements and widget values it has on screen."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.ws = None
+        self.query_string = ""
+        self.elements: Dict[Tuple[int, ...], object] = {}
+        self.widgets: Dict[str, Tuple[str, object, str]] = {}
+        self.values: Dict[str, object] = {}
+
+    async def connect(self) -> None:
+        try:
+            import websockets
+        except ImportError:
+            raise RuntimeError("the load test needs the websockets package (pip install websockets)") from None
+
+        host = self.url.split("://", 1)[-1].rstrip("/")
+        self.ws = await websockets.connect(f"ws://{host}/_stcore/stream", subprotocols=["streamlit"], origin=f"http://{host}", max_size=None)
+
+    async def close(self) -> None:
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def rerun(self, trigger: Optional[str] = None, fragment_id: str = "") -> float:
+        """Send the current widget values (plus a one-off button trigger) and wait for the run to finish."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        state = msg.rerun_script
+        state.query_string = self.query_string
+        state.fragment_id = fragment_id
+        for widget_id, value in self.values.items():
+            state.widget_states.widgets.append(value)
+        if trigger is not None:
+            button = state.widget_states.widgets.add()
+            button.id = trigger
+            button.trigger_value = True
+
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        received = {}
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await asyncio.wait_for(self.ws.recv(), RERUN_TIMEOUT))
+            kind = forward.WhichOneof("type")
+            if kind == "delta":
+                received[tuple(forward.metadata.delta_path)] = forward.delta
+            elif kind == "page_info_changed":
+                self.query_string = forward.page_info_changed.query_string
+            elif kind == "script_finished":
+                break
+        elapsed = time.perf_counter() - start
+        self._update(received, fragment_id)
+        return elapsed
+
+    def _update(self, received: dict, fragment_id: str) -> None:
+        if fragment_id:
+            self.elements = {path: delta for path, delta in self.elements.items() if delta.fragment_id != fragment_id or path in received}
+            self.elements.update(received)
+        else:
+            self.elements = received
+        self.widgets = {}
+        for path, delta in sorted(self.elements.items()):
+            if delta.WhichOneof("type") != "new_element":
+                continue
+            element = delta.new_element
+            kind = element.WhichOneof("type")
+            if kind == "exception":
+                raise SessionError(element.exception.message)
+            if kind in WIDGET_TYPES:
+                proto = getattr(element, kind)
+                self.widgets[proto.id] = (kind, proto, delta.fragment_id)
+        # Unmounted widgets drop their values, as in the browser.
+        self.values = {widget_id: value for widget_id, value in self.values.items() if widget_id in self.widgets}
+
+    def find(self, kind: str, key: Optional[str] = None, label: Optional[str] = None) -> Tuple[str, object, str]:
+        for widget_id, (widget_kind, proto, fragment_id) in self.widgets.items():
+            if widget_kind != kind:
+                continue
+            if key is not None and widget_id.endswith(f"-{key}"):
+                return widget_id, proto, fragment_id
+            if label is not None and label in proto.label:
+                return widget_id, proto, fragment_id
+        raise SessionError(f"No {kind} with key={key!r} label={label!r} on screen")
+
+    def set(self, widget_id: str, **value) -> None:
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        state = WidgetState(id=widget_id)
+        for field_name, field_value in value.items():
+            if field_name == "double_array_value":
+                state.double_array_value.data[:] = field_value
+            else:
+                setattr(state, field_name, field_value)
+        self.values[widget_id] = state
+
+    async def set_slider(self, key: str, value: float) -> float:
+        widget_id, _, fragment_id = self.find("slider", key=key)
+        self.set(widget_id, double_array_value=[value])
+        return await self.rerun(fragment_id=fragment_id)
+
+    async def select(self, key: str, rng: random.Random) -> float:
+        widget_id, proto, fragment_id = self.find("selectbox", key=key)
+        self.set(widget_id, string_value=proto.options[rng.randrange(1, len(proto.options))])
+        return await self.rerun(fragment_id=fragment_id)
+
+    async def click(self, key: Optional[str] = None, label: Optional[str] = None) -> float:
+        widget_id, _, fragment_id = self.find("button", key=key, label=label)
+        return await self.rerun(trigger=widget_id, fragment_id=fragment_id)
+
+    def text(self) -> str:
+        return "\n".join(delta.new_element.markdown.body for delta in self.elements.values()
+                         if delta.WhichOneof("type") == "new_element" and delta.new_element.WhichOneof("type") == "markdown")
+
+async def play_session(url: str, rng: random.Random, players: int, rounds: int, samples: Dict[str, List[float]], barrier: asyncio.Barrier) -> None:
+    session = Session(url)
+    try:
+        await session.connect()
+        samples["load"].append(await session.rerun())
+        samples["setup"].append(await session.set_slider("num_players", players))
+        samples["setup"].append(await session.set_slider("num_rounds", rounds))
+        await asyncio.wait_for(barrier.wait(), BARRIER_TIMEOUT)
+        samples["start_game"].append(await session.click(key="start_button"))
+        for turn in range(players * rounds):
+            for slot in range(rng.randint(1, 3)):
+                samples["select"].append(await session.select(f"tool_{slot}", rng))
+            samples["play"].append(await session.click(key="play"))
+            reflection = next(widget_id for widget_id, (kind, _, _) in session.widgets.items() if kind == "text_area" and "-ref_" in widget_id)
+            session.set(reflection, string_value=f"Turn {turn + 1}: " + " ".join(rng.choices(("listened", "framed", "asked", "waited", "escalated", "shared"), k=12)))
+            samples["submit"].append(await session.click(label="Submit"))
+        if "Game Over" not in session.text():
+            raise SessionError("session did not reach the game-over screen")
+    finally:
+        await session.close()
+
+def percentiles(values: Sequence[float]) -> Dict[str, float]:
+    if len(values) < 2:
+        value = values[0] if values else 0.0
+        return {"p50": value, "p95": value, "p99": value}
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(db: str) -> Tuple[subprocess.Popen, str]:
+    port = free_port()
+    env = dict(os.environ, STRATEGY_SHUFFLE_DB=db)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", str(APP_PATH), "--server.headless", "true", "--server.port", str(port),
+         "--server.address", "127.0.0.1", "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"],
+        cwd=APP_PATH.parent, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{url}/_stcore/health", timeout=1):
+                return server, url
+        except OSError:
+            if server.poll() is not None:
+                break
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("streamlit server did not start")
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    """The process's high-water resident set, from /proc (Linux only)."""
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+async def run_sessions(url: str, concurrency: int, sessions: int, players: int, rounds: int, seed: int) -> Tuple[Dict[str, List[float]], List[str], float]:
+    samples: Dict[str, List[float]] = defaultdict(list)
+    failures: List[str] = []
+    rng = random.Random(seed)
+    seeds = [rng.getrandbits(64) for _ in range(sessions)]
+    # The first wave clicks Start Game together; later sessions start as slots free up.
+    barrier = asyncio.Barrier(concurrency)
+    released = asyncio.Barrier(1)
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(n: int) -> None:
+        async with slots:
+            try:
+                await play_session(url, random.Random(seeds[n]), players, rounds, samples, barrier if n < concurrency else released)
+            except Exception as e:
+                failures.append(f"{type(e).__name__}: {e}")
+                if n < concurrency and not barrier.broken:
+                    # Don't leave the rest of the first wave waiting for a session that never arrives.
+                    await barrier.abort()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(sessions)))
+    return samples, failures, time.perf_counter() - started
+
+def run_level(url: Optional[str], concurrency: int, sessions: int, players: int, rounds: int, seed: int, db: str) -> dict:
+    server = None
+    if url is None:
+        server, url = start_server(db)
+    try:
+        samples, failures, wall = asyncio.run(run_sessions(url, concurrency, sessions, players, rounds, seed))
+        peak = peak_rss_mb(server.pid) if server is not None else None
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    every = [t for times in samples.values() for t in times]
+    return {
+        "concurrency": concurrency,
+        "sessions": sessions - len(failures),
+        "failures": failures,
+        "reruns": len(every),
+        "wall_seconds": wall,
+        "reruns_per_second": len(every) / wall if wall else 0.0,
+        "latency": percentiles(every),
+        "actions": {action: percentiles(samples[action]) for action in ACTIONS if samples.get(action)},
+        "server_peak_rss_mb": peak,
+    }
+
+def format_level(level: dict) -> str:
+    ms = lambda q: f"{q['p50'] * 1000:7.1f} {q['p95'] * 1000:7.1f} {q['p99'] * 1000:7.1f}"
+    memory = f", server peak RSS {level['server_peak_rss_mb']:,.0f} MB" if level["server_peak_rss_mb"] is not None else ""
+    lines = [
+        f"concurrency {level['concurrency']}: {level['sessions']} sessions, {level['reruns']:,} reruns in {level['wall_seconds']:.1f}s "
+        f"({level['reruns_per_second']:.1f} reruns/s){memory}",
+        f"  {'':<12} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7}",
+        f"  {'all':<12} {ms(level['latency'])}",
+    ]
+    lines += [f"  {action:<12} {ms(q)}" for action, q in level["actions"].items()]
+    if level["failures"]:
+        lines.append(f"  {len(level['failures'])} failed session(s), first: {level['failures'][0]}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=8, help="sessions played at each concurrency level")
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--url", help="use the Streamlit server already running here instead of starting one per level")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write the per-level report as JSON")
+    args = parser.parse_args(argv)
+    if not 1 <= args.players <= 6 or not 1 <= args.rounds <= 9:
+        parser.error("the app allows 1-6 players and 1-9 rounds")
+    db = os.environ.get("STRATEGY_SHUFFLE_DB") or str(Path(tempfile.mkdtemp(prefix="strategy-shuffle-load-")) / "games.sqlite3")
+
+    print(f"{args.sessions} sessions x {args.players} players x {args.rounds} rounds per level, {os.cpu_count()} CPUs")
+    levels = []
+    for concurrency in args.concurrency:
+        level = run_level(args.url, min(concurrency, args.sessions), args.sessions, args.players, args.rounds, args.seed, db)
+        levels.append(level)
+        print(format_level(level), flush=True)
+    if args.output:
+        args.output.write_text(json.dumps(levels, indent=2) + "\n", encoding="utf-8")
+    return 1 if any(level["failures"] for level in levels) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
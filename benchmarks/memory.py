@@ -0,0 +1,60 @@
+"""Per-session memory of game state.
+
+    python -m benchmarks.memory --sessions 500 --players 6 --rounds 9
+
+Builds many independent GameEngine sessions, plays them to the point
+given by --stage and reports the bytes allocated per session, as
+measured by tracemalloc. Shared catalog data is loaded before measuring,
+so it is not counted against any session.
+"""
+import argparse
+import random
+import tracemalloc
+
+from game import GameEngine, GameState
+
+STAGES = ("start", "mid-game", "game-over")
+
+def build_session(rng: random.Random, players: int, rounds: int, stage: str, reflection_chars: int) -> GameEngine:
+    engine = GameEngine(seed=rng.getrandbits(64))
+    state = engine.start([f"Player {i + 1}" for i in range(players)], rounds)
+    turns = {"start": 0, "mid-game": players * rounds // 2, "game-over": players * rounds}[stage]
+    for turn in range(turns):
+        engine.play_turn(state.current_player, rng.sample(GameState.TOOLS, 3))
+        if reflection_chars:
+            engine.submit_reflection(f"{turn} " + "x" * reflection_chars)
+        engine.advance()
+    return engine
+
+def measure(sessions: int, players: int, rounds: int, stage: str, reflection_chars: int, seed: int = 0) -> float:
+    rng = random.Random(seed)
+    build_session(rng, players, rounds, stage, reflection_chars)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [build_session(rng, players, rounds, stage, reflection_chars) for _ in range(sessions)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del kept
+    return allocated / sessions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--rounds", type=int, default=9)
+    parser.add_argument("--reflection-chars", type=int, default=200, help="length of each reflection; 0 skips reflections")
+    args = parser.parse_args(argv)
+
+    print(f"{args.sessions} sessions, {args.players} players x {args.rounds} rounds")
+    results = {}
+    for stage in STAGES:
+        for chars in sorted({0, args.reflection_chars}):
+            per_session = measure(args.sessions, args.players, args.rounds, stage, chars)
+            results[stage, chars] = per_session
+            label = f"{stage}, {'no reflections' if not chars else f'{chars}-char reflections'}"
+            print(f"  {label:<40} {per_session:>10,.0f} bytes/session")
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""Timing benchmarks for scoring, sessions and app reruns.
+
+    python -m benchmarks.suite                     # compare against baseline.json
+    python -m benchmarks.suite --groups scoring player
+    python -m benchmarks.suite --update-baseline
+
+Each benchmark reports seconds per operation: the median over --repeat
+runs. A result slower than its baseline by more than the baseline's
+threshold (a ratio, editable in the JSON file) counts as a regression
+and the run exits with status 1. Baselines are machine specific, so
+refresh them with --update-baseline on the machine doing the comparison.
+
+The app group drives app.py headlessly through Streamlit's AppTest and
+times one script run per screen and per button click. It records to a
+throwaway event store unless STRATEGY_SHUFFLE_DB is already set. The
+startup group measures a cold process instead: importing app.py's own
+modules, and the first AppTest run of the setup screen, each in a fresh
+interpreter with Streamlit itself already imported.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from game import GameState, calculate_points
+from models import Player
+from scoring import BatchScorer
+from simulate import run_chunk
+
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+DEFAULT_THRESHOLD = 1.25
+APP_THRESHOLD = 1.5
+
+Results = Dict[str, List[float]]
+
+def per_op(fn: Callable[[], None], number: int, repeat: int) -> List[float]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return times
+
+def bench_scoring(repeat: int) -> Results:
+    tools, scenario = GameState.TOOLS[:3], GameState.SCENARIOS[0]
+    scorer = BatchScorer()
+    rng = random.Random(0)
+    hands = scorer.encode([rng.sample(range(len(scorer.tools)), 3) for _ in range(10_000)])
+    scenario_indices = [rng.randrange(len(scorer.scenarios)) for _ in range(len(hands))]
+    all_hands = len(scorer.scenarios) * len(scorer.combos)
+
+    batch_pairs = per_op(lambda: scorer.score_pairs(hands, scenario_indices), 20, repeat)
+    batch_all = per_op(scorer.score, 20, repeat)
+    return {
+        "scoring.calculate_points": per_op(lambda: calculate_points(tools, scenario), 20_000, repeat),
+        "scoring.batch_pairs_per_hand": [t / len(hands) for t in batch_pairs],
+        "scoring.batch_catalog_per_hand": [t / all_hands for t in batch_all],
+    }
+
+def bench_player(repeat: int) -> Results:
+    token = GameState.SCENARIOS[0].reward_token
+    calls = {
+        "add_round_score": lambda p: p.add_round_score(5),
+        "add_token": lambda p: p.add_token(token),
+        "add_reflection": lambda p: p.add_reflection("Listened before acting."),
+        "get_total_points": lambda p: p.get_total_points(),
+        "get_final_score": lambda p: p.get_final_score(),
+    }
+    results: Results = {}
+    for name, call in calls.items():
+        times = []
+        for _ in range(repeat):
+            player = Player("Bench")
+            for score in range(9):
+                player.add_round_score(score)
+                player.add_token(token)
+            times += per_op(lambda: call(player), 20_000, 1)
+        results[f"player.{name}"] = times
+    return results
+
+def bench_simulation(repeat: int) -> Results:
+    games = 200
+    times = []
+    for seed in range(repeat):
+        start = time.perf_counter()
+        run_chunk(seed, games, [4], [5], ["random", "greedy-synergy", "power-type-diverse"])
+        times.append((time.perf_counter() - start) / games)
+    return {"simulate.game_4x5": times}
+
+def quiet_streamlit() -> None:
+    """Drop Streamlit's per-run console warnings, which swamp the report."""
+    from streamlit import config, logger
+    config.set_option("logger.level", "error")
+    logger.set_log_level("error")
+
+STARTUP_SCRIPTS = {
+    "startup.import_app": """
+import sys, time
+import streamlit
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import app
+print(time.perf_counter() - start)
+""",
+    "startup.first_render": """
+import time
+from streamlit import config, logger
+from streamlit.testing.v1 import AppTest
+config.set_option("logger.level", "error")
+logger.set_log_level("error")
+at = AppTest.from_file({app!r}, default_timeout=60)
+start = time.perf_counter()
+at.run()
+print(time.perf_counter() - start)
+""",
+}
+
+def bench_startup(repeat: int) -> Results:
+    env = dict(os.environ)
+    env.setdefault("STRATEGY_SHUFFLE_DB", str(Path(tempfile.mkdtemp(prefix="strategy-shuffle-bench-")) / "games.sqlite3"))
+    results: Results = {}
+    for name, script in STARTUP_SCRIPTS.items():
+        code = script.format(root=str(APP_PATH.parent), app=str(APP_PATH))
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, "-c", code], cwd=APP_PATH.parent, env=env, capture_output=True, text=True, check=True)
+            results.setdefault(name, []).append(float(out.stdout.split()[-1]))
+    return results
+
+def bench_app(repeat: int) -> Results:
+    os.environ.setdefault("STRATEGY_SHUFFLE_DB", str(Path(tempfile.mkdtemp(prefix="strategy-shuffle-bench-")) / "games.sqlite3"))
+    from streamlit.testing.v1 import AppTest
+    quiet_streamlit()
+
+    results: Results = {}
+
+    def timed(name: str, fn: Callable[[], object]) -> None:
+        start = time.perf_counter()
+        fn()
+        results.setdefault(name, []).append(time.perf_counter() - start)
+
+    def submit(at):
+        next(t for t in at.text_area if t.key and t.key.startswith("ref_")).input("Asked before acting.")
+        return next(b for b in at.button if "Submit" in b.label).click().run()
+
+    for _ in range(repeat):
+        at = AppTest.from_file(str(APP_PATH), default_timeout=60)
+        at.run()
+        timed("app.setup", at.run)
+        at.slider(key="num_rounds").set_value(1).run()
+        timed("app.click_start_game", lambda: at.button(key="start_button").click().run())
+        timed("app.mid_round", at.run)
+        at.selectbox(key="tool_0").select_index(1).run()
+        at.selectbox(key="tool_1").select_index(1).run()
+        timed("app.click_play", lambda: at.button(key="play").click().run())
+        timed("app.scored_turn", at.run)
+        timed("app.click_submit", lambda: submit(at))
+        at.selectbox(key="tool_0").select_index(2).run()
+        at.button(key="play").click().run()
+        timed("app.click_submit_game_over", lambda: submit(at))
+        if not any("Game Over" in m.value for m in at.markdown):
+            raise RuntimeError("app benchmark did not reach the game-over screen")
+        timed("app.game_over", at.run)
+    return results
+
+GROUPS: Dict[str, Callable[[int], Results]] = {
+    "scoring": bench_scoring,
+    "player": bench_player,
+    "simulate": bench_simulation,
+    "app": bench_app,
+    "startup": bench_startup,
+}
+
+def threshold_for(name: str) -> float:
+    return APP_THRESHOLD if name.startswith(("app.", "startup.")) else DEFAULT_THRESHOLD
+
+def summarize(results: Results, baseline: Dict[str, dict]) -> Dict[str, dict]:
+    summary = {}
+    for name, times in results.items():
+        previous = baseline.get(name, {})
+        summary[name] = {
+            "seconds": statistics.median(times),
+            "min": min(times),
+            "samples": len(times),
+            "threshold": previous.get("threshold", threshold_for(name)),
+        }
+    return summary
+
+def load_baseline(path: Path) -> Dict[str, dict]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))["results"]
+    except FileNotFoundError:
+        return {}
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.2f} ns"
+
+def compare(summary: Dict[str, dict], baseline: Dict[str, dict]) -> List[str]:
+    regressions = []
+    for name, result in summary.items():
+        line = f"  {name:<34} {format_seconds(result['seconds'])}"
+        previous = baseline.get(name)
+        if previous:
+            ratio = result["seconds"] / previous["seconds"]
+            line += f"   {ratio:5.2f}x baseline"
+            if ratio > result["threshold"]:
+                line += f"  REGRESSION (limit {result['threshold']:.2f}x)"
+                regressions.append(name)
+        print(line)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--groups", nargs="+", choices=list(GROUPS), default=list(GROUPS))
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark; the median is reported")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--output", type=Path, help="also write this run's results as JSON")
+    parser.add_argument("--update-baseline", action="store_true", help="merge this run's results into the baseline file")
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline(args.baseline)
+    summary, regressions = {}, []
+    for group in args.groups:
+        print(f"{group}:")
+        results = summarize(GROUPS[group](args.repeat), baseline)
+        regressions += compare(results, {} if args.update_baseline else baseline)
+        summary.update(results)
+
+    document = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": summary,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(document, indent=2) + "\n", encoding="utf-8")
+    if args.update_baseline:
+        document["results"] = {**baseline, **summary}
+        args.baseline.write_text(json.dumps(document, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
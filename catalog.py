@@ -0,0 +1,297 @@
+"""Card catalog loaded from content packs.
+
+A content pack is a directory holding any of ``tools``, ``scenarios``,
+``guide``, ``lessons``, ``reflection_prompts`` and ``rules`` as ``.json``,
+``.yaml``/``.yml`` or ``.csv``. Packs are merged in order: tools, guide
+entries, scenarios and rules with the same key replace earlier ones,
+lessons and prompts are appended. The parsed catalog, with its rules
+compiled, is pickled under ``.cache/`` and reused until any source file's
+mtime or size changes.
+"""
+import csv
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from models import PowerType, Tool, ToolCard, ScenarioCard
+from rules import DEFAULT_RULES, RULE_KINDS, Rule, RuleSet
+
+ROOT = Path(__file__).resolve().parent
+DEFAULT_PACK = ROOT / "content" / "default"
+CACHE_DIR = ROOT / ".cache"
+CONTENT_ENV = "STRATEGY_SHUFFLE_CONTENT"
+SECTIONS = ("tools", "scenarios", "guide", "lessons", "reflection_prompts", "rules")
+EXTENSIONS = (".json", ".yaml", ".yml", ".csv")
+LIST_SEPARATOR = ";"
+# Bump when the pickled Catalog or RuleSet layout changes.
+CACHE_VERSION = 6
+
+class CatalogError(ValueError):
+    pass
+
+@dataclass
+class GuideEntry:
+    tool: Tool
+    power_type: str
+    description: str
+    key_idea: str
+
+@dataclass
+class Catalog:
+    tools: List[ToolCard]
+    scenarios: List[ScenarioCard]
+    guide: List[GuideEntry] = field(default_factory=list)
+    lessons: List[str] = field(default_factory=list)
+    reflection_prompts: List[str] = field(default_factory=list)
+    rules: List[Rule] = field(default_factory=lambda: list(DEFAULT_RULES))
+    fingerprint: str = ""
+    tool_cards: Dict[Tool, ToolCard] = field(init=False)
+    tool_labels: List[str] = field(init=False)
+    tool_label_index: Dict[str, int] = field(init=False)
+    rule_set: RuleSet = field(init=False)
+
+    def __post_init__(self):
+        self.tool_cards = {card.tool: card for card in self.tools}
+        self.tool_labels = [f"{card.tool.value} ({card.power_type.value})" for card in self.tools]
+        self.tool_label_index = {label: i for i, label in enumerate(self.tool_labels)}
+        self.rule_set = RuleSet(self.tools, self.scenarios, self.rules)
+
+def pack_paths() -> List[Path]:
+    extra = os.environ.get(CONTENT_ENV, "")
+    return [DEFAULT_PACK] + [Path(p) for p in extra.split(os.pathsep) if p]
+
+def source_files(packs: Sequence[Path]) -> List[Path]:
+    files = []
+    for pack in packs:
+        for section in SECTIONS:
+            files.extend(pack / f"{section}{ext}" for ext in EXTENSIONS if (pack / f"{section}{ext}").is_file())
+    return files
+
+def fingerprint(files: Sequence[Path]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for path in files:
+        stat = path.stat()
+        digest.update(f"{path}\0{stat.st_mtime_ns}\0{stat.st_size}\n".encode())
+    return digest.hexdigest()
+
+def load_catalog(packs: Optional[Sequence[Path]] = None, use_cache: bool = True) -> Catalog:
+    packs = [Path(p) for p in (pack_paths() if packs is None else packs)]
+    files = source_files(packs)
+    key = fingerprint(files)
+    cache_file = CACHE_DIR / f"catalog-{hashlib.blake2b('|'.join(map(str, packs)).encode(), digest_size=8).hexdigest()}.pickle"
+    if use_cache:
+        cached = _read_cache(cache_file, key)
+        if cached is not None:
+            return cached
+    catalog = compile_catalog(files, key)
+    if use_cache:
+        _write_cache(cache_file, catalog)
+    return catalog
+
+def compile_catalog(files: Sequence[Path], key: str = "") -> Catalog:
+    tools: Dict[Tool, ToolCard] = {}
+    scenarios: Dict[str, ScenarioCard] = {}
+    guide: Dict[Tool, GuideEntry] = {}
+    lessons: List[str] = []
+    prompts: List[str] = []
+    rules: Dict[str, Rule] = {}
+    for path in files:
+        section = path.stem
+        for n, row in enumerate(_read_rows(path), 1):
+            where = f"{path}, entry {n}"
+            if section == "tools":
+                card = _parse_tool(row, where)
+                tools[card.tool] = card
+            elif section == "scenarios":
+                scenario = _parse_scenario(row, where)
+                scenarios[scenario.name] = scenario
+            elif section == "guide":
+                entry = GuideEntry(_enum(Tool, _field(row, "tool", where), where), _field(row, "power_type", where), _field(row, "description", where), _field(row, "key_idea", where))
+                guide[entry.tool] = entry
+            elif section == "lessons":
+                lessons.append(_text(row, "lesson", where))
+            elif section == "reflection_prompts":
+                prompts.append(_text(row, "prompt", where))
+            elif section == "rules":
+                rule = _parse_rule(row, where)
+                rules[rule.id] = rule
+
+    if not tools:
+        raise CatalogError("No tools found in content packs")
+    if not scenarios:
+        raise CatalogError("No scenarios found in content packs")
+    for scenario in scenarios.values():
+        missing = [t.value for t in scenario.suggested_tools if t not in tools]
+        if missing:
+            raise CatalogError(f"Scenario {scenario.name!r} suggests tools with no card: {', '.join(missing)}")
+    for rule in rules.values():
+        missing = [t.value for t in (rule.tool, *rule.with_tools) if t is not None and t not in tools]
+        if missing:
+            raise CatalogError(f"Rule {rule.id!r} refers to tools with no card: {', '.join(missing)}")
+    tool_order = list(Tool)
+    return Catalog(
+        tools=sorted(tools.values(), key=lambda card: tool_order.index(card.tool)),
+        scenarios=list(scenarios.values()),
+        guide=sorted(guide.values(), key=lambda entry: tool_order.index(entry.tool)),
+        lessons=lessons,
+        reflection_prompts=prompts,
+        rules=list(rules.values()) if rules else list(DEFAULT_RULES),
+        fingerprint=key,
+    )
+
+class CatalogLoader:
+    """Process-wide catalog that reloads when its source files change.
+
+    A reload that fails validation keeps serving the last good catalog and
+    leaves the problem in ``error`` until the files change again.
+    """
+
+    def __init__(self, packs: Optional[Sequence[Path]] = None):
+        self.packs = packs
+        self.lock = threading.Lock()
+        self.catalog = load_catalog(packs)
+        self.error: Optional[CatalogError] = None
+        self.seen = self.catalog.fingerprint
+
+    def get(self) -> Catalog:
+        packs = [Path(p) for p in (pack_paths() if self.packs is None else self.packs)]
+        key = fingerprint(source_files(packs))
+        if key != self.seen:
+            with self.lock:
+                if key != self.seen:
+                    try:
+                        self.catalog = load_catalog(packs)
+                        self.error = None
+                    except CatalogError as e:
+                        self.error = e
+                    self.seen = key
+        return self.catalog
+
+def _read_rows(path: Path) -> list:
+    try:
+        if path.suffix == ".csv":
+            with path.open(newline="", encoding="utf-8") as f:
+                return list(csv.DictReader(f))
+        text = path.read_text(encoding="utf-8")
+    except OSError as e:
+        raise CatalogError(f"{path}: {e}") from e
+    if path.suffix == ".json":
+        try:
+            rows = json.loads(text)
+        except ValueError as e:
+            raise CatalogError(f"{path}: {e}") from e
+    else:
+        try:
+            import yaml
+        except ImportError:
+            raise CatalogError(f"{path}: PyYAML is required to load YAML content packs") from None
+        try:
+            rows = yaml.safe_load(text) or []
+        except yaml.YAMLError as e:
+            raise CatalogError(f"{path}: {e}") from e
+    if not isinstance(rows, list):
+        raise CatalogError(f"{path}: expected a list of entries")
+    return rows
+
+def _field(row, name: str, where: str):
+    if not isinstance(row, dict) or row.get(name) in (None, ""):
+        raise CatalogError(f"{where}: missing {name!r}")
+    return row[name]
+
+def _text(row, name: str, where: str) -> str:
+    return str(row if isinstance(row, str) else _field(row, name, where))
+
+def _enum(enum, value, where: str):
+    for member in enum:
+        if value in (member.value, member.name):
+            return member
+    raise CatalogError(f"{where}: unknown {enum.__name__} {value!r}")
+
+def _list(value) -> list:
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(LIST_SEPARATOR) if item.strip()]
+    return list(value)
+
+def _int(row, name: str, where: str, default=None) -> int:
+    value = row.get(name) if isinstance(row, dict) else None
+    if value in (None, ""):
+        if default is None:
+            raise CatalogError(f"{where}: missing {name!r}")
+        value = default
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise CatalogError(f"{where}: {name!r} must be an integer, got {value!r}") from None
+    if number < 0:
+        raise CatalogError(f"{where}: {name!r} must not be negative")
+    return number
+
+def _bool(row, name: str, where: str) -> bool:
+    value = row.get(name, False)
+    if isinstance(value, str):
+        if value.strip().lower() not in ("", "true", "false", "yes", "no", "1", "0"):
+            raise CatalogError(f"{where}: {name!r} must be true or false, got {value!r}")
+        return value.strip().lower() in ("true", "yes", "1")
+    return bool(value)
+
+def _parse_tool(row, where: str) -> ToolCard:
+    return ToolCard(
+        _enum(Tool, _field(row, "tool", where), where),
+        _enum(PowerType, _field(row, "power_type", where), where),
+        _int(row, "points", where),
+        _field(row, "effect", where),
+        _field(row, "description", where),
+    )
+
+def _parse_scenario(row, where: str) -> ScenarioCard:
+    return ScenarioCard(
+        _field(row, "name", where),
+        _field(row, "situation", where),
+        [_enum(Tool, name, where) for name in _list(_field(row, "suggested_tools", where))],
+        _field(row, "reward_token", where),
+        _field(row, "lesson", where),
+        _field(row, "play_example", where),
+        _int(row, "difficulty", where, default=1),
+    )
+
+def _parse_rule(row, where: str) -> Rule:
+    kind = _field(row, "kind", where)
+    if kind not in RULE_KINDS:
+        raise CatalogError(f"{where}: unknown rule kind {kind!r}, expected one of {', '.join(RULE_KINDS)}")
+    tool = row.get("tool") or None
+    if kind in ("effect", "carry") and tool is None:
+        raise CatalogError(f"{where}: {kind} rules need a 'tool'")
+    return Rule(
+        id=str(row.get("id") or kind),
+        kind=kind,
+        bonus=_int(row, "bonus", where, default=0),
+        threshold=_int(row, "threshold", where, default=None if kind in ("synergy", "variety", "token") else 0),
+        tool=_enum(Tool, tool, where) if tool is not None else None,
+        when_suggested=_bool(row, "when_suggested", where),
+        min_difficulty=_int(row, "min_difficulty", where, default=0),
+        scenarios=tuple(_list(row.get("scenarios") or [])),
+        with_tools=tuple(_enum(Tool, name, where) for name in _list(row.get("with_tools") or [])),
+    )
+
+def _read_cache(cache_file: Path, key: str) -> Optional[Catalog]:
+    try:
+        with cache_file.open("rb") as f:
+            version, cached_key, catalog = pickle.load(f)
+    except (OSError, pickle.PickleError, EOFError, ValueError, AttributeError, ImportError):
+        return None
+    return catalog if version == CACHE_VERSION and cached_key == key else None
+
+def _write_cache(cache_file: Path, catalog: Catalog) -> None:
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("wb", dir=cache_file.parent, delete=False) as f:
+            pickle.dump((CACHE_VERSION, catalog.fingerprint, catalog), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f.name, cache_file)
+    except OSError:
+        pass
@@ -0,0 +1,141 @@
+import math
+import random
+from array import array
+from collections import deque
+from typing import Callable, Dict, Generic, List, Optional, Sequence, TypeVar, Union
+
+from models import Tool, ScenarioCard
+
+T = TypeVar("T")
+Weight = Union[Sequence[float], Callable[[T], float]]
+
+class Deck(Generic[T]):
+    """A seeded deck dealt one card at a time.
+
+    Each cycle deals every card with a positive weight exactly once. Weights
+    bias the order a cycle is dealt in (weighted sampling without
+    replacement), so heavier cards tend to come up earlier. When a cycle is
+    exhausted the deck reshuffles, keeping the last ``avoid_repeats`` cards
+    away from the start of the next cycle.
+
+    Unweighted decks shuffle lazily (Fisher-Yates one step per draw, with
+    a sparse map of swapped positions), so starting a cycle is O(1) and
+    memory grows with the cards drawn rather than the size of the deck.
+    Weighted decks sort the cycle up front, an O(n log n) reshuffle once
+    per n draws.
+    """
+
+    def __init__(self, cards: Sequence[T], seed: Optional[int] = None, weight: Optional[Weight] = None, avoid_repeats: int = 1, rng: Optional[random.Random] = None):
+        if not cards:
+            raise ValueError("Cannot deal from an empty deck")
+        self.cards = cards
+        self.rng = rng if rng is not None else random.Random(seed)
+        if weight is None:
+            self.weights = None
+        elif callable(weight):
+            self.weights = [float(weight(card)) for card in cards]
+        else:
+            self.weights = [float(w) for w in weight]
+            if len(self.weights) != len(cards):
+                raise ValueError(f"Expected {len(cards)} weights, got {len(self.weights)}")
+        if self.weights is not None and not any(w > 0 for w in self.weights):
+            raise ValueError("At least one card needs a positive weight")
+        self.avoid_repeats = max(0, avoid_repeats)
+        self.recent = deque(maxlen=self.avoid_repeats or None)
+        self.cycles = 0
+        self.dealt: List[int] = []
+        self.order: Optional[array] = None
+        self.swaps: Dict[int, int] = {}
+        self.size = 0
+        self.position = 0
+
+    def __len__(self) -> int:
+        return self.size - self.position
+
+    def draw_index(self) -> int:
+        if self.position >= self.size:
+            self.reshuffle()
+        index = self.order[self.position] if self.order is not None else self._draw_lazy()
+        self.position += 1
+        self.dealt.append(index)
+        if self.avoid_repeats:
+            self.recent.append(index)
+        return index
+
+    def draw(self) -> T:
+        return self.cards[self.draw_index()]
+
+    def resume(self, dealt: Sequence[int], cycles: int = 1) -> None:
+        """Continue cycle number ``cycles``, in which ``dealt`` have already been dealt."""
+        self.reshuffle()
+        self.cycles = cycles
+        dealt = list(dict.fromkeys(dealt))
+        if self.order is not None:
+            skip = set(dealt)
+            self.order = array("I", [i for i in self.order if i not in skip])
+            self.size = len(self.order)
+        else:
+            slots: Dict[int, int] = {}
+            for card in dealt:
+                slot, position = slots.get(card, card), self.position
+                moved = self.swaps.get(position, position)
+                self.swaps[slot] = moved
+                slots[moved] = slot
+                self.swaps.pop(position, None)
+                self.position += 1
+        self.dealt = dealt
+        if self.avoid_repeats:
+            self.recent.extend(dealt)
+
+    def reshuffle(self) -> None:
+        self.dealt = []
+        self.swaps.clear()
+        self.position = 0
+        self.cycles += 1
+        if self.weights is None:
+            self.size = len(self.cards)
+            return
+        # Efraimidis-Spirakis keys log(u) / w, largest first.
+        rng = self.rng
+        keys = {i: math.log(1.0 - rng.random()) / w for i, w in enumerate(self.weights) if w > 0}
+        order = sorted(keys, key=keys.__getitem__, reverse=True)
+        self._push_back_recent(order)
+        self.order = array("I", order)
+        self.size = len(order)
+
+    def _draw_lazy(self) -> int:
+        position, size, swaps, rng = self.position, self.size, self.swaps, self.rng
+        avoid = ()
+        if position < self.avoid_repeats < size:
+            avoid = set(self.recent).difference(self.dealt)
+            if len(avoid) >= size - position:
+                avoid = ()
+        while True:
+            j = rng.randrange(position, size)
+            index = swaps.get(j, j)
+            if index not in avoid:
+                break
+        if j != position:
+            swaps[j] = swaps.get(position, position)
+        swaps.pop(position, None)
+        return index
+
+    def _push_back_recent(self, order) -> None:
+        window = min(self.avoid_repeats, len(order))
+        recent = set(self.recent)
+        if not recent or window >= len(order):
+            return
+        candidates = [j for j in range(window, len(order)) if order[j] not in recent]
+        for i in range(window):
+            if order[i] in recent and candidates:
+                j = candidates.pop(self.rng.randrange(len(candidates)))
+                order[i], order[j] = order[j], order[i]
+
+def by_difficulty(weights: Dict[int, float], default: float = 1.0) -> Callable[[ScenarioCard], float]:
+    return lambda scenario: weights.get(scenario.difficulty, default)
+
+def by_suggested_tool(weights: Dict[Tool, float], default: float = 1.0) -> Callable[[ScenarioCard], float]:
+    def weight(scenario: ScenarioCard) -> float:
+        tools = scenario.suggested_tools
+        return sum(weights.get(tool, default) for tool in tools) / len(tools) if tools else default
+    return weight
@@ -0,0 +1,187 @@
+"""Bulk export of turn-by-turn game histories.
+
+    python export.py turns.parquet
+    python export.py turns.csv --db .data/games.sqlite3
+    python export.py - --format jsonl --simulate 1000000 --players 2-4 --policies random greedy-synergy
+
+Writes one row per turn (player, round, scenario, tools, score breakdown,
+token and reflection) for every finished game in the event store, or for
+bot games played on the fly with ``--simulate``. Events are read and
+rows written in chunks of ``--chunk-size``, so memory stays flat however
+many turns are exported. Parquet output needs pyarrow.
+"""
+import argparse
+import csv
+import json
+import random
+import sys
+import time
+from contextlib import closing
+from itertools import islice
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+COLUMNS = ("game_id", "player", "name", "round", "scenario", "tools", "base", "synergy", "variety", "effects", "total", "token", "reflection")
+FORMATS = ("csv", "jsonl", "parquet")
+TOKEN, REFLECTION = COLUMNS.index("token"), COLUMNS.index("reflection")
+
+Row = Tuple[Any, ...]
+
+def turn_rows(events: Iterable[Tuple[str, int, str, Dict[str, Any]]]) -> Iterator[Row]:
+    """Fold (game_id, seq, kind, payload) events, ordered by game and seq, into one row per finished turn."""
+    names: List[str] = []
+    turn = None
+    for game_id, seq, kind, payload in events:
+        if kind == "start":
+            names, turn = payload["players"], None
+        elif kind == "add_round_score":
+            player = payload["player"]
+            turn = [game_id, player, names[player] if player < len(names) else "", payload["round"], payload["scenario"],
+                    payload["tools"], payload["base"], payload["synergy"], payload["variety"], payload.get("effects", 0),
+                    payload["total"], None, ""]
+        elif turn is not None and kind == "add_token":
+            turn[TOKEN] = payload["token"]
+        elif turn is not None and kind == "add_reflection":
+            turn[REFLECTION] = payload["reflection"]
+        elif turn is not None and kind == "advance":
+            yield tuple(turn)
+            turn = None
+
+def recorded_events(store, chunk_size: int = 10_000) -> Iterator[Tuple[str, int, str, Dict[str, Any]]]:
+    """Events of every finished game in ``store``, streamed in primary-key order."""
+    store.flush()
+    with closing(store.connect()) as conn:
+        cursor = conn.execute(
+            "SELECT game_id, seq, kind, payload FROM events "
+            "WHERE EXISTS (SELECT 1 FROM final_scores f WHERE f.game_id = events.game_id) ORDER BY game_id, seq"
+        )
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for game_id, seq, kind, payload in rows:
+                yield game_id, seq, kind, json.loads(payload)
+
+class _Recorder:
+    """Stand-in for ``EventStore`` that keeps one game's events in memory."""
+
+    def __init__(self):
+        self.events: List[Tuple[str, int, str, Dict[str, Any]]] = []
+
+    def append(self, state, kind: str, payload: Dict[str, Any]) -> int:
+        self.events.append((state.game_id, len(self.events) + 1, kind, payload))
+        return len(self.events)
+
+def simulated_events(games: int, players: Sequence[int], rounds: Sequence[int], policies: Sequence[str], seed: int = 0) -> Iterator[Tuple[str, int, str, Dict[str, Any]]]:
+    """Events of ``games`` bot games from ``simulate``, played one at a time as they are consumed."""
+    from simulate import SimStats, play_game
+
+    rng, stats, recorder = random.Random(seed), SimStats(), _Recorder()
+    for _ in range(games):
+        play_game(rng, rng.choice(players), rng.choice(rounds), policies, stats, store=recorder)
+        yield from recorder.events
+        recorder.events.clear()
+
+def chunked(rows: Iterable[Row], size: int) -> Iterator[List[Row]]:
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+def write_csv(chunks: Iterable[List[Row]], out: IO[str]) -> int:
+    tools = COLUMNS.index("tools")
+    writer = csv.writer(out)
+    writer.writerow(COLUMNS)
+    count = 0
+    for chunk in chunks:
+        writer.writerows(row[:tools] + (";".join(row[tools]),) + row[tools + 1:] for row in chunk)
+        count += len(chunk)
+    return count
+
+def write_jsonl(chunks: Iterable[List[Row]], out: IO[str]) -> int:
+    count = 0
+    for chunk in chunks:
+        out.write("".join(json.dumps(dict(zip(COLUMNS, row))) + "\n" for row in chunk))
+        count += len(chunk)
+    return count
+
+def write_parquet(chunks: Iterable[List[Row]], out) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("pyarrow is required for Parquet export") from None
+    schema = pa.schema([
+        ("game_id", pa.string()), ("player", pa.int16()), ("name", pa.string()), ("round", pa.int16()),
+        ("scenario", pa.string()), ("tools", pa.list_(pa.string())), ("base", pa.int32()), ("synergy", pa.int32()),
+        ("variety", pa.int32()), ("effects", pa.int32()), ("total", pa.int32()), ("token", pa.string()), ("reflection", pa.string()),
+    ])
+    count = 0
+    with pq.ParquetWriter(out, schema) as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_arrays([pa.array(column, type=field.type) for column, field in zip(zip(*chunk), schema)], schema=schema))
+            count += len(chunk)
+    return count
+
+def export(events: Iterable[Tuple[str, int, str, Dict[str, Any]]], out, fmt: str, chunk_size: int = 10_000, limit: Optional[int] = None) -> int:
+    """Write the turns in ``events``, or the first ``limit`` of them, to ``out`` (a text stream for csv/jsonl,
+    a path or binary stream for parquet) and return the number of rows written."""
+    rows = turn_rows(events)
+    if limit is not None:
+        rows = islice(rows, limit)
+    chunks = chunked(rows, chunk_size)
+    if fmt == "csv":
+        return write_csv(chunks, out)
+    if fmt == "jsonl":
+        return write_jsonl(chunks, out)
+    if fmt == "parquet":
+        return write_parquet(chunks, out)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+def main(argv=None):
+    from simulate import POLICIES, parse_range
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output", help="output file, or - for stdout (csv/jsonl)")
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the output file's extension")
+    parser.add_argument("--db", help="event store to export (defaults to STRATEGY_SHUFFLE_DB)")
+    parser.add_argument("--simulate", type=int, metavar="GAMES", help="export this many bot games instead of recorded ones")
+    parser.add_argument("--players", type=lambda s: parse_range(s, 1, 6), default=[2], help="player count or range for --simulate")
+    parser.add_argument("--rounds", type=lambda s: parse_range(s, 1, 9), default=[5], help="round count or range for --simulate")
+    parser.add_argument("--policies", nargs="+", choices=sorted(POLICIES), default=["random"], help="bot policies for --simulate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or args.output.rpartition(".")[2]
+    if fmt not in FORMATS:
+        parser.error(f"cannot tell the format of {args.output!r}; pass --format")
+    if fmt == "parquet" and args.output == "-":
+        parser.error("Parquet output needs a file")
+
+    store = None
+    if args.simulate is not None:
+        events = simulated_events(args.simulate, args.players, args.rounds, args.policies, args.seed)
+    else:
+        from store import DEFAULT_DB, EventStore
+        store = EventStore(args.db or DEFAULT_DB)
+        events = recorded_events(store, args.chunk_size)
+
+    started = time.perf_counter()
+    try:
+        if fmt == "parquet":
+            count = export(events, args.output, fmt, args.chunk_size)
+        elif args.output == "-":
+            count = export(events, sys.stdout, fmt, args.chunk_size)
+        else:
+            with open(args.output, "w", newline="", encoding="utf-8") as out:
+                count = export(events, out, fmt, args.chunk_size)
+    except ValueError as e:
+        parser.exit(1, f"{e}\n")
+    finally:
+        if store is not None:
+            store.close()
+    elapsed = time.perf_counter() - started
+    print(f"exported {count:,} turns in {elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f} turns/s)", file=sys.stderr)
+    return count
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import random
+import uuid
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+from models import Tool, ToolCard, ScenarioCard, Player
+from catalog import Catalog, CatalogLoader
+from deck import Deck, Weight
+from instrumentation import timed
+from rules import MAX_TOOLS_PER_TURN, Score
+
+catalog_loader = CatalogLoader()
+
+class GameError(Exception):
+    pass
+
+@dataclass(slots=True)
+class TurnResult:
+    player: Player
+    scenario: ScenarioCard
+    tools: List[ToolCard]
+    base_points: int
+    synergy_bonus: int
+    variety_bonus: int
+    total: int
+    token: Optional[str] = None
+    effect_bonus: int = 0
+
+@dataclass(slots=True)
+class GameState:
+    game_id: str = ""
+    players: List[Player] = field(default_factory=list)
+    max_rounds: int = 5
+    current_round: int = 0
+    current_player_index: int = 0
+    catalog: Optional[Catalog] = None
+    scenario_index: int = -1
+    deck: Optional[Deck] = None
+    game_started: bool = False
+    game_over: bool = False
+    last_turn: Optional[TurnResult] = None
+    reflection_prompt: Optional[str] = None
+    
+    CATALOG = catalog_loader.catalog
+    TOOLS = CATALOG.tools
+    SCENARIOS = CATALOG.scenarios
+    REFLECTION_PROMPTS = CATALOG.reflection_prompts
+    
+    @property
+    def current_player(self) -> Player:
+        return self.players[self.current_player_index]
+    
+    @property
+    def current_scenario(self) -> Optional[ScenarioCard]:
+        return self.catalog.scenarios[self.scenario_index] if self.scenario_index >= 0 else None
+    
+    @property
+    def turn_scored(self) -> bool:
+        return self.last_turn is not None
+
+def refresh_catalog() -> Catalog:
+    """Pick up content pack edits; games already in progress keep their deck."""
+    catalog = catalog_loader.get()
+    if catalog is not GameState.CATALOG:
+        GameState.CATALOG = catalog
+        GameState.TOOLS = catalog.tools
+        GameState.SCENARIOS = catalog.scenarios
+        GameState.REFLECTION_PROMPTS = catalog.reflection_prompts
+    return catalog
+
+@timed("calculate_points")
+def calculate_points(chosen_tools, scenario, carry_in: int = 0, catalog: Optional[Catalog] = None) -> Score:
+    """Score one play under the catalog's rules (the shared catalog by default)."""
+    return (catalog or GameState.CATALOG).rule_set.score_cards(chosen_tools, scenario, carry_in)
+
+class GameEngine:
+    """Turn-by-turn game rules with no UI attached.
+
+    A game runs start() once, then for every player in every round
+    play_turn(), an optional submit_reflection() and advance(), until
+    ``state.game_over`` is set.
+    """
+    
+    def __init__(self, seed: Optional[int] = None, scenario_weight: Optional[Weight] = None, store=None):
+        self.rng = random.Random(seed)
+        self.scenario_weight = scenario_weight
+        self.store = store
+        self.state = GameState()
+    
+    def start(self, player_names: Sequence[str], num_rounds: int) -> GameState:
+        if not player_names:
+            raise GameError("A game needs at least one player")
+        if num_rounds < 1:
+            raise GameError("A game needs at least one round")
+        catalog = GameState.CATALOG
+        self.state = GameState(
+            game_id=uuid.uuid4().hex,
+            players=[Player(name) for name in player_names],
+            max_rounds=num_rounds,
+            current_round=1,
+            catalog=catalog,
+            deck=Deck(catalog.scenarios, weight=self.scenario_weight, rng=self.rng),
+            game_started=True,
+        )
+        self.state.scenario_index = self.state.deck.draw_index()
+        self._record("start", players=list(player_names), max_rounds=num_rounds)
+        return self.state
+    
+    def play_turn(self, player: Player, tools: Sequence[ToolCard]) -> TurnResult:
+        state = self._require_in_progress()
+        if state.turn_scored:
+            raise GameError(f"{player.name} has already played this turn")
+        if player is not state.current_player:
+            raise GameError(f"It is not {player.name}'s turn")
+        tools = list(tools)
+        if not tools:
+            raise GameError("Choose at least one tool")
+        if len(tools) > MAX_TOOLS_PER_TURN:
+            raise GameError(f"Choose at most {MAX_TOOLS_PER_TURN} tools")
+        if len({tool.tool for tool in tools}) != len(tools):
+            raise GameError("Each tool can only be played once per turn")
+        
+        scenario = state.current_scenario
+        rule_set = state.catalog.rule_set
+        score = calculate_points(tools, scenario, player.carry_bonus, state.catalog)
+        player.add_round_score(score.total)
+        player.carry_bonus = score.carry
+        self._record("add_round_score", player=state.current_player_index, round=state.current_round,
+                     tools=[tool.tool.value for tool in tools], base=score.base, synergy=score.synergy, variety=score.variety,
+                     effects=score.effects, total=score.total, carry=score.carry)
+        token = None
+        if rule_set.earns_token(score.total):
+            token = scenario.reward_token
+            player.add_token(token)
+            self._record("add_token", player=state.current_player_index, round=state.current_round, token=token)
+        state.last_turn = TurnResult(player, scenario, tools, score.base, score.synergy, score.variety, score.total, token, score.effects)
+        state.reflection_prompt = self.rng.choice(state.catalog.reflection_prompts)
+        return state.last_turn
+    
+    def submit_reflection(self, reflection: str) -> None:
+        state = self._require_scored_turn()
+        if reflection:
+            state.current_player.add_reflection(reflection)
+            self._record("add_reflection", player=state.current_player_index, round=state.current_round,
+                         prompt=state.reflection_prompt, reflection=reflection)
+    
+    def advance(self) -> GameState:
+        state = self._require_scored_turn()
+        state.last_turn = None
+        state.reflection_prompt = None
+        if state.current_player_index < len(state.players) - 1:
+            state.current_player_index += 1
+        elif state.current_round < state.max_rounds:
+            state.current_round += 1
+            state.current_player_index = 0
+            state.scenario_index = state.deck.draw_index()
+        else:
+            state.game_over = True
+        standings = {}
+        if state.game_over:
+            standings["standings"] = [[p.name, p.get_final_score(), p.get_token_count()] for p in state.players]
+        self._record("advance", round=state.current_round, player=state.current_player_index, game_over=state.game_over, **standings)
+        return state
+    
+    def reset(self) -> GameState:
+        self.state = GameState()
+        return self.state
+    
+    def restore(self, replay) -> GameState:
+        """Continue a game rebuilt by ``EventStore.replay``."""
+        catalog = GameState.CATALOG
+        lookup = {scenario.name: i for i, scenario in enumerate(catalog.scenarios)}
+        missing = [name for name in {replay.scenario, *replay.dealt} if name not in lookup]
+        if missing:
+            raise GameError(f"Scenario no longer in the catalog: {', '.join(sorted(missing))}")
+        deck = Deck(catalog.scenarios, weight=self.scenario_weight, rng=self.rng)
+        deck.resume([lookup[name] for name in replay.dealt], replay.cycle)
+        self.state = GameState(
+            game_id=replay.game_id,
+            players=replay.players,
+            max_rounds=replay.max_rounds,
+            current_round=replay.current_round,
+            current_player_index=replay.current_player_index,
+            catalog=catalog,
+            scenario_index=lookup[replay.scenario],
+            deck=deck,
+            game_started=True,
+            game_over=replay.game_over,
+        )
+        if replay.last_turn is not None:
+            turn = replay.last_turn
+            tools = [catalog.tool_cards[Tool(name)] for name in turn["tools"]]
+            player = self.state.current_player
+            token = player.tokens[-1] if catalog.rule_set.earns_token(turn["total"]) else None
+            self.state.last_turn = TurnResult(player, self.state.current_scenario, tools, turn["base"], turn["synergy"], turn["variety"], turn["total"], token, turn.get("effects", 0))
+            self.state.reflection_prompt = self.rng.choice(catalog.reflection_prompts)
+        return self.state
+    
+    def _record(self, kind: str, **payload) -> None:
+        if self.store is None:
+            return
+        state = self.state
+        payload["scenario"] = state.current_scenario.name
+        payload["cycle"] = state.deck.cycles
+        self.store.append(state, kind, payload)
+    
+    def _require_in_progress(self) -> GameState:
+        if not self.state.game_started or self.state.game_over:
+            raise GameError("No game in progress")
+        return self.state
+    
+    def _require_scored_turn(self) -> GameState:
+        state = self._require_in_progress()
+        if not state.turn_scored:
+            raise GameError(f"{state.current_player.name} has not played this turn yet")
+        return state
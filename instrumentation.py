@@ -0,0 +1,256 @@
+"""Opt-in timing and counters for app reruns.
+
+Enabled by environment variables read at import time:
+
+    STRATEGY_SHUFFLE_METRICS         JSONL output path ("1" for .data/metrics.jsonl)
+    STRATEGY_SHUFFLE_METRICS_SAMPLE  fraction of reruns written to the JSONL log (default 1.0)
+    STRATEGY_SHUFFLE_METRICS_PORT    serve Prometheus text format on this local port
+
+Counters and duration histograms are updated on every rerun; the sample
+rate only limits JSONL records and session-state size measurement, which
+are the expensive parts. When metrics are off every helper is a no-op and
+``timed`` returns the function unchanged.
+"""
+import contextvars
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import random
+import sys
+import threading
+import time
+import types
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+_setting = os.environ.get("STRATEGY_SHUFFLE_METRICS", "")
+ENABLED = _setting not in ("", "0")
+LOG_PATH = Path(__file__).resolve().parent / ".data" / "metrics.jsonl" if _setting == "1" else Path(_setting or ".")
+SAMPLE_RATE = float(os.environ.get("STRATEGY_SHUFFLE_METRICS_SAMPLE", "1.0"))
+PORT = int(os.environ.get("STRATEGY_SHUFFLE_METRICS_PORT", "0"))
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+PREFIX = "strategy_shuffle"
+MAX_TRACKED_SESSIONS = 10_000
+
+@dataclass
+class RerunRecord:
+    scope: str
+    session: str
+    started: float
+    sampled: bool
+    action: Optional[str] = None
+    timers: Dict[str, float] = field(default_factory=dict)
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reruns: Dict[str, int] = defaultdict(int)
+        self.actions: Dict[str, int] = defaultdict(int)
+        self.session_reruns: "OrderedDict[str, int]" = OrderedDict()
+        self.histograms: Dict[str, List[float]] = {}
+        self.state_bytes: Tuple[int, int] = (0, 0)
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self.lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = [0] * (len(BUCKETS) + 2)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    hist[i] += 1
+                    break
+            else:
+                hist[len(BUCKETS)] += 1
+            hist[-1] += seconds
+
+    def render(self) -> str:
+        with self.lock:
+            lines = [f"# TYPE {PREFIX}_reruns_total counter"]
+            lines += [f'{PREFIX}_reruns_total{{scope="{scope}"}} {n}' for scope, n in sorted(self.reruns.items())]
+            lines.append(f"# TYPE {PREFIX}_actions_total counter")
+            lines += [f'{PREFIX}_actions_total{{action="{action}"}} {n}' for action, n in sorted(self.actions.items())]
+            lines.append(f"# TYPE {PREFIX}_duration_seconds histogram")
+            for name, hist in sorted(self.histograms.items()):
+                running = 0
+                for bound, n in zip(BUCKETS + ("+Inf",), hist):
+                    running += n
+                    lines.append(f'{PREFIX}_duration_seconds_bucket{{name="{name}",le="{bound}"}} {running}')
+                lines.append(f'{PREFIX}_duration_seconds_sum{{name="{name}"}} {hist[-1]}')
+                lines.append(f'{PREFIX}_duration_seconds_count{{name="{name}"}} {running}')
+            total, count = self.state_bytes
+            lines.append(f"# TYPE {PREFIX}_session_state_bytes summary")
+            lines.append(f"{PREFIX}_session_state_bytes_sum {total}")
+            lines.append(f"{PREFIX}_session_state_bytes_count {count}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+_current: contextvars.ContextVar = contextvars.ContextVar("rerun", default=None)
+_pending = threading.local()
+_log: Optional[logging.Logger] = None
+_server_lock = threading.Lock()
+_server: Optional[ThreadingHTTPServer] = None
+_server_failed = False
+
+def _logger() -> logging.Logger:
+    global _log
+    if _log is None:
+        LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+        log = logging.getLogger("strategy_shuffle.metrics")
+        log.propagate = False
+        log.setLevel(logging.INFO)
+        log.addHandler(logging.handlers.RotatingFileHandler(LOG_PATH, maxBytes=10_000_000, backupCount=5, encoding="utf-8"))
+        _log = log
+    return _log
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = metrics.render().encode()
+        self.send_response(200 if self.path in ("/", "/metrics") else 404)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def serve(port: int = PORT) -> None:
+    """Start the Prometheus text endpoint on localhost, once per process.
+
+    If the port can't be bound (say, another app process already serves it)
+    the failure is logged once and the endpoint stays off.
+    """
+    global _server, _server_failed
+    if not port:
+        return
+    with _server_lock:
+        if _server is None and not _server_failed:
+            try:
+                _server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+            except OSError as e:
+                _server_failed = True
+                logging.getLogger(__name__).warning("Metrics endpoint disabled: cannot listen on port %d: %s", port, e)
+                return
+            threading.Thread(target=_server.serve_forever, name="metrics-endpoint", daemon=True).start()
+
+def _record_timer(name: str, seconds: float) -> None:
+    metrics.observe(name, seconds)
+    record = _current.get()
+    if record is not None:
+        record.timers[name] = record.timers.get(name, 0.0) + seconds
+    else:
+        if not hasattr(_pending, "timers"):
+            _pending.timers = {}
+        _pending.timers[name] = _pending.timers.get(name, 0.0) + seconds
+
+@contextmanager
+def _timer(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record_timer(name, time.perf_counter() - start)
+
+def timer(name: str):
+    return _timer(name) if ENABLED else nullcontext()
+
+def timed(name: str):
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _record_timer(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+def action(name: str):
+    """Count a user action and time its handler."""
+    if not ENABLED:
+        return nullcontext()
+    with metrics.lock:
+        metrics.actions[name] += 1
+    _pending.action = name
+    return _timer(f"action.{name}")
+
+@contextmanager
+def _rerun(scope: str, session: str, state_fn):
+    if _current.get() is not None:
+        with _timer(f"render.{scope}"):
+            yield
+        return
+    record = RerunRecord(scope, session, time.perf_counter(), random.random() < SAMPLE_RATE)
+    record.action = getattr(_pending, "action", None)
+    record.timers.update(getattr(_pending, "timers", {}))
+    _pending.action, _pending.timers = None, {}
+    token = _current.set(record)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+        elapsed = time.perf_counter() - record.started
+        metrics.observe(f"rerun.{scope}", elapsed)
+        with metrics.lock:
+            metrics.reruns[scope] += 1
+            session_reruns = metrics.session_reruns.pop(session, 0) + 1
+            metrics.session_reruns[session] = session_reruns
+            if len(metrics.session_reruns) > MAX_TRACKED_SESSIONS:
+                metrics.session_reruns.popitem(last=False)
+        if record.sampled:
+            _write(record, elapsed, session_reruns, state_fn)
+
+def rerun(scope: str, session: str = "", state_fn=None):
+    """Wrap one script or fragment run; nested calls become render timers."""
+    return _rerun(scope, session, state_fn) if ENABLED else nullcontext()
+
+def _write(record: RerunRecord, elapsed: float, session_reruns: int, state_fn) -> None:
+    entry = {
+        "ts": time.time(),
+        "session": record.session,
+        "session_reruns": session_reruns,
+        "scope": record.scope,
+        "action": record.action,
+        "rerun_ms": round(elapsed * 1000, 3),
+        "timers_ms": {name: round(seconds * 1000, 3) for name, seconds in record.timers.items()},
+    }
+    if state_fn is not None:
+        entry.update(state_fn())
+        if "state_bytes" in entry:
+            with metrics.lock:
+                total, count = metrics.state_bytes
+                metrics.state_bytes = (total + entry["state_bytes"], count + 1)
+    _logger().info(json.dumps(entry))
+
+_NOT_STATE = (type, types.ModuleType, types.FunctionType, types.MethodType, types.BuiltinFunctionType)
+
+def deep_sizeof(obj, shared: tuple = ()) -> int:
+    """Approximate bytes reachable from ``obj``, skipping instances of ``shared`` types."""
+    seen, size, stack = set(), 0, [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, shared) or isinstance(item, _NOT_STATE):
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        else:
+            if hasattr(item, "__dict__"):
+                stack.append(vars(item))
+            for slot in getattr(type(item), "__slots__", ()):
+                if hasattr(item, slot):
+                    stack.append(getattr(item, slot))
+    return size
@@ -0,0 +1,98 @@
+import threading
+from array import array
+from enum import Enum
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+class PowerType(Enum):
+    SOFT = "Soft Power"
+    HARD = "Hard Power"
+    SMART = "Smart Power"
+
+class Tool(Enum):
+    ETHOS = "Ethos"
+    LOGOS = "Logos"
+    PATHOS = "Pathos"
+    ALLOCENTRISM = "Allocentrism"
+    EXCHANGE = "Exchange"
+    NETWORKS = "Networks"
+    COALITIONS = "Coalitions"
+    TEAM_BUILDING = "Team Building"
+    MIGHT = "Might"
+    INTENTIONALITY = "Intentionality"
+    SITUATIONAL_AWARENESS = "Situational Awareness"
+    AGENCY = "Agency"
+
+@dataclass
+class ToolCard:
+    tool: Tool
+    power_type: PowerType
+    points_value: int
+    effect: str
+    description: str
+
+@dataclass
+class ScenarioCard:
+    name: str
+    situation: str
+    suggested_tools: List[Tool]
+    reward_token: str
+    lesson: str
+    play_example: str
+    difficulty: int = 1
+
+TOKEN_NAMES: List[str] = []
+_token_ids: Dict[str, int] = {}
+_token_lock = threading.Lock()
+
+def intern_token(token: str) -> int:
+    token_id = _token_ids.get(token)
+    if token_id is None:
+        with _token_lock:
+            token_id = _token_ids.get(token)
+            if token_id is None:
+                token_id = _token_ids[token] = len(TOKEN_NAMES)
+                TOKEN_NAMES.append(token)
+    return token_id
+
+@dataclass(slots=True)
+class Player:
+    name: str
+    influence_points: int = 0
+    token_ids: array = field(default_factory=lambda: array("H"))
+    round_scores: array = field(default_factory=lambda: array("h"))
+    reflections: List[str] = field(default_factory=list)
+    carry_bonus: int = 0
+    
+    @property
+    def tokens(self) -> List[str]:
+        return [TOKEN_NAMES[i] for i in self.token_ids]
+    
+    def get_total_points(self):
+        return self.influence_points
+    
+    def get_final_score(self):
+        token_bonus = len(self.token_ids) * 5
+        return self.get_total_points() + token_bonus
+    
+    def add_round_score(self, score: int):
+        self.round_scores.append(score)
+        self.influence_points += score
+    
+    def add_token(self, token: str):
+        self.token_ids.append(intern_token(token))
+    
+    def add_reflection(self, reflection: str):
+        self.reflections.append(reflection)
+    
+    def get_token_count(self):
+        return len(self.token_ids)
+    
+    # Token ids are only meaningful inside one process, so pickles carry names.
+    def __getstate__(self):
+        return self.name, self.influence_points, self.tokens, self.round_scores, self.reflections, self.carry_bonus
+    
+    def __setstate__(self, state):
+        self.name, self.influence_points, tokens, self.round_scores, self.reflections, *carry = state
+        self.carry_bonus = carry[0] if carry else 0
+        self.token_ids = array("H", map(intern_token, tokens))
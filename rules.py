@@ -0,0 +1,313 @@
+"""Scoring rules as data, compiled into array evaluators.
+
+A turn scores the points of the tools played plus whatever the rules add:
+
+    synergy  +bonus when at least ``threshold`` played tools are suggested
+             by the scenario
+    variety  +bonus when at least ``threshold`` power types are played
+    effect   +bonus when ``tool`` is played, optionally only if the scenario
+             suggests it, is at least ``min_difficulty``, is one of
+             ``scenarios`` or every tool in ``with_tools`` is played too
+    carry    +bonus on the same player's next play when ``tool`` is played
+    token    the scenario's reward token is earned at ``threshold`` points
+
+``RuleSet`` compiles a rule list against one tool and scenario list into
+arrays and scores whole batches of hands with matrix products. Single
+hands, the per-click path, are scored with plain ints against the
+scenario's rules, compiled the first time that scenario is played.
+"""
+import math
+from dataclasses import dataclass
+from itertools import combinations
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models import PowerType, Tool, ToolCard, ScenarioCard
+
+TOKEN_THRESHOLD = 7
+MAX_TOOLS_PER_TURN = 3
+SYNERGY_MIN_SUGGESTED = 2
+SYNERGY_BONUS = 2
+VARIETY_BONUS = 1
+
+RULE_KINDS = ("synergy", "variety", "effect", "carry", "token")
+POWER_TYPES = list(PowerType)
+
+@dataclass(frozen=True)
+class Rule:
+    id: str
+    kind: str
+    bonus: int = 0
+    threshold: int = 0
+    tool: Optional[Tool] = None
+    when_suggested: bool = False
+    min_difficulty: int = 0
+    scenarios: Tuple[str, ...] = ()
+    with_tools: Tuple[Tool, ...] = ()
+
+    def applies_to(self, scenario: ScenarioCard) -> bool:
+        if self.when_suggested and self.tool not in scenario.suggested_tools:
+            return False
+        if scenario.difficulty < self.min_difficulty:
+            return False
+        return not self.scenarios or scenario.name in self.scenarios
+
+DEFAULT_RULES = (
+    Rule("synergy", "synergy", bonus=SYNERGY_BONUS, threshold=SYNERGY_MIN_SUGGESTED),
+    Rule("variety", "variety", bonus=VARIETY_BONUS, threshold=len(POWER_TYPES)),
+    Rule("token", "token", threshold=TOKEN_THRESHOLD),
+)
+
+class Score(NamedTuple):
+    base: int
+    synergy: int
+    variety: int
+    effects: int
+    total: int
+    carry: int
+
+@dataclass
+class BatchScores:
+    """Score components shaped (num_scenarios, num_selections), or 1-D for pairs."""
+    base: np.ndarray
+    synergy: np.ndarray
+    variety: np.ndarray
+    effects: np.ndarray
+    total: np.ndarray
+    carry: np.ndarray
+    token_threshold: float = TOKEN_THRESHOLD
+
+    @property
+    def earns_token(self) -> np.ndarray:
+        return self.total >= self.token_threshold
+
+class HandRules(NamedTuple):
+    """The effect rules that apply in one scenario: one-tool bonuses by tool
+    and (tools required together, bonus) pairs."""
+    solo: Dict[Tool, int]
+    combos: Tuple[Tuple[frozenset, int], ...]
+
+NO_EFFECTS = HandRules({}, ())
+# Score(...) goes through a Python-level __new__; building the tuple directly skips it.
+_new_score = tuple.__new__
+
+def tool_combinations(num_tools: int, max_tools: int = MAX_TOOLS_PER_TURN) -> List[Tuple[int, ...]]:
+    """Every selection of 0..max_tools distinct tool indices, smallest hands first."""
+    return [combo for size in range(max_tools + 1) for combo in combinations(range(num_tools), size)]
+
+def _tiers(rules: Sequence[Rule], kind: str) -> List[Tuple[int, int]]:
+    return [(rule.threshold, rule.bonus) for rule in rules if rule.kind == kind]
+
+class RuleSet:
+    """Rules compiled against a fixed tool and scenario list.
+
+    Tools are encoded as a points vector and a power-type one-hot matrix,
+    hands as boolean membership rows over the tool list. Per scenario, the
+    suggested tools and the effect bonuses that need only one tool become
+    (num_scenarios, num_tools) matrices; effects that need several tools
+    become rows of a (num_rules, num_tools) requirement matrix.
+    """
+
+    def __init__(self, tools: Sequence[ToolCard], scenarios: Sequence[ScenarioCard], rules: Sequence[Rule] = DEFAULT_RULES, max_tools: int = MAX_TOOLS_PER_TURN):
+        self.tools = list(tools)
+        self.scenarios = list(scenarios)
+        self.rules = list(rules)
+        self.tool_index = {card.tool: i for i, card in enumerate(self.tools)}
+        self.scenario_lookup = {s.name: i for i, s in enumerate(self.scenarios)}
+        self.points = np.array([t.points_value for t in self.tools], dtype=np.int32)
+        self.power_onehot = np.array([[t.power_type is p for p in POWER_TYPES] for t in self.tools], dtype=np.int32)
+        self.synergy_tiers = _tiers(self.rules, "synergy")
+        self.variety_tiers = _tiers(self.rules, "variety")
+        tokens = [rule.threshold for rule in self.rules if rule.kind == "token"]
+        self.token_threshold = tokens[-1] if tokens else math.inf
+        self.carry = np.zeros(len(self.tools), dtype=np.int32)
+        for rule in self.rules:
+            if rule.kind == "carry" and rule.tool in self.tool_index:
+                self.carry[self.tool_index[rule.tool]] += rule.bonus
+        self.effect_rules = [rule for rule in self.rules if rule.kind == "effect" and rule.tool in self.tool_index and all(t in self.tool_index for t in rule.with_tools)]
+        self.combo_rules = [rule for rule in self.effect_rules if rule.with_tools]
+        self.combo_needs = np.zeros((len(self.combo_rules), len(self.tools)), dtype=np.int32)
+        for r, rule in enumerate(self.combo_rules):
+            self.combo_needs[r, [self.tool_index[t] for t in (rule.tool, *rule.with_tools)]] = 1
+        self.combo_sizes = self.combo_needs.sum(axis=1)
+        self.suggested, self.solo_effects, self.combo_effects = self._scenario_terms(self.scenarios)
+        # Terms no rule contributes to are skipped when scoring.
+        self.has_solo_effects = bool(self.solo_effects.any())
+        self.has_carry = bool(self.carry.any())
+        self.max_tools = max_tools
+        self.combos = tool_combinations(len(self.tools), max_tools)
+        self.selections = self.encode(self.combos)
+        self.combo_at_mask = {sum(1 << i for i in combo): c for c, combo in enumerate(self.combos)}
+        self._rows: Dict[int, np.ndarray] = {}
+        self.carry_by_tool = {card.tool: int(bonus) for card, bonus in zip(self.tools, self.carry) if bonus}
+        self._hand_rules: Dict[int, HandRules] = {}
+
+    def _scenario_terms(self, scenarios: Sequence[ScenarioCard]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        suggested = np.array([[t.tool in s.suggested_tools for t in self.tools] for s in scenarios], dtype=np.int32).reshape(len(scenarios), len(self.tools))
+        solo = np.zeros((len(scenarios), len(self.tools)), dtype=np.int32)
+        combo = np.zeros((len(scenarios), len(self.combo_rules)), dtype=np.int32)
+        for si, scenario in enumerate(scenarios):
+            for rule in self.effect_rules:
+                if rule.applies_to(scenario) and not rule.with_tools:
+                    solo[si, self.tool_index[rule.tool]] += rule.bonus
+            for r, rule in enumerate(self.combo_rules):
+                if rule.applies_to(scenario):
+                    combo[si, r] = rule.bonus
+        return suggested, solo, combo
+
+    def encode(self, hands: Sequence[Sequence[int]]) -> np.ndarray:
+        """Membership matrix (len(hands), num_tools) for hands given as tool indices."""
+        selections = np.zeros((len(hands), len(self.tools)), dtype=np.int32)
+        for row, hand in enumerate(hands):
+            selections[row, list(hand)] = 1
+        return selections
+
+    def score(self, selections: Optional[np.ndarray] = None, scenario_indices: Optional[Sequence[int]] = None) -> BatchScores:
+        """Score every selection against every scenario.
+
+        Defaults to all legal selections against the whole catalog.
+        """
+        selections = self.selections if selections is None else np.asarray(selections, dtype=np.int32)
+        rows = slice(None) if scenario_indices is None else np.asarray(scenario_indices)
+        base, variety, carry = self._hand_terms(selections)
+        synergy = self._apply_tiers(self.suggested[rows] @ selections.T, self.synergy_tiers)
+        total = base + synergy + variety
+        effects = 0
+        if self.has_solo_effects:
+            effects = self.solo_effects[rows] @ selections.T
+        if self.combo_rules:
+            effects = effects + self.combo_effects[rows] @ self._combo_hits(selections).T
+        if self.has_solo_effects or self.combo_rules:
+            total = total + effects
+
+        shape = synergy.shape
+        base, variety, carry, effects = (np.broadcast_to(a, shape) for a in (base, variety, carry, effects))
+        return BatchScores(base, synergy, variety, effects, total, carry, self.token_threshold)
+
+    def score_pairs(self, selections: np.ndarray, scenario_indices: Sequence[int], carry_in=0) -> BatchScores:
+        """Score hand i against scenario i, returning 1-D arrays.
+
+        ``carry_in`` is a scalar or per-hand array of bonuses carried over
+        from each player's previous play; it is counted under effects.
+        """
+        selections = np.asarray(selections, dtype=np.int32)
+        rows = np.asarray(scenario_indices)
+        base, variety, carry = self._hand_terms(selections)
+        synergy = self._apply_tiers(np.einsum("ij,ij->i", self.suggested[rows], selections), self.synergy_tiers)
+        total = base + synergy + variety
+        effects = carry_in
+        if self.has_solo_effects:
+            effects = effects + np.einsum("ij,ij->i", self.solo_effects[rows], selections)
+        if self.combo_rules:
+            effects = effects + np.einsum("ij,ij->i", self.combo_effects[rows], self._combo_hits(selections))
+        if np.any(effects):
+            total = total + effects
+        effects, carry = (np.broadcast_to(a, total.shape) for a in (effects, carry))
+        return BatchScores(base, synergy, variety, effects, total, carry, self.token_threshold)
+
+    def _hand_terms(self, selections: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        base = selections @ self.points
+        power_types_used = np.count_nonzero(selections @ self.power_onehot, axis=1)
+        variety = self._apply_tiers(power_types_used, self.variety_tiers)
+        return base, variety, selections @ self.carry if self.has_carry else 0
+
+    def _combo_hits(self, selections: np.ndarray) -> np.ndarray:
+        return (selections @ self.combo_needs.T == self.combo_sizes).astype(np.int32)
+
+    @staticmethod
+    def _apply_tiers(counts: np.ndarray, tiers: Sequence[Tuple[int, int]]) -> np.ndarray:
+        if not tiers:
+            return np.zeros(np.shape(counts), dtype=np.int32)
+        bonus = np.where(counts >= tiers[0][0], tiers[0][1], 0)
+        for threshold, amount in tiers[1:]:
+            bonus += np.where(counts >= threshold, amount, 0)
+        return bonus
+
+    def scenario_rows(self, scenario_index: int) -> np.ndarray:
+        """Score components of every legal hand in one scenario, shaped (num_combos, 6)
+        in ``Score`` field order with no carry-in; scored on first use."""
+        rows = self._rows.get(scenario_index)
+        if rows is None:
+            scores = self.score(scenario_indices=[scenario_index])
+            columns = [scores.base, scores.synergy, scores.variety, scores.effects, scores.total, scores.carry]
+            rows = self._rows[scenario_index] = np.stack(columns, axis=-1)[0]
+        return rows
+
+    def hand_rules(self, scenario: ScenarioCard) -> HandRules:
+        solo: Dict[Tool, int] = {}
+        combos = []
+        for rule in self.effect_rules:
+            if not rule.applies_to(scenario):
+                continue
+            if rule.with_tools:
+                combos.append((frozenset((rule.tool, *rule.with_tools)), rule.bonus))
+            else:
+                solo[rule.tool] = solo.get(rule.tool, 0) + rule.bonus
+        return HandRules(solo, tuple(combos))
+
+    def score_hand(self, tool_indices: Sequence[int], scenario_index: int, carry_in: int = 0) -> Score:
+        if any(i < 0 or i >= len(self.tools) for i in tool_indices):
+            raise ValueError(f"Not a legal hand of at most {self.max_tools} distinct tools: {list(tool_indices)}")
+        return self.score_cards([self.tools[i] for i in tool_indices], self.scenarios[scenario_index], carry_in)
+
+    def score_cards(self, cards: Sequence[ToolCard], scenario: ScenarioCard, carry_in: int = 0) -> Score:
+        """Score one hand of cards with plain ints, the per-click path.
+
+        A compiled scenario's effect rules are picked out the first time it
+        is played; scenarios outside the compiled list are read directly.
+        Without effect rules the scenario is never looked up.
+        Tools and power types are compared in lists rather than hashed, as
+        enum hashing costs more than the rest of the scoring.
+        """
+        if len(cards) > self.max_tools:
+            raise ValueError(f"Not a legal hand of at most {self.max_tools} distinct tools: {[card.tool.value for card in cards]}")
+        rules = NO_EFFECTS
+        if self.effect_rules:
+            scenario_index = self.scenario_lookup.get(scenario.name)
+            known = self.scenarios[scenario_index] if scenario_index is not None else None
+            if known is scenario or (known is not None and known == scenario):
+                rules = self._hand_rules.get(scenario_index)
+                if rules is None:
+                    rules = self._hand_rules[scenario_index] = self.hand_rules(scenario)
+            else:
+                rules = self.hand_rules(scenario)
+
+        suggested = scenario.suggested_tools
+        base = hits = 0
+        tools, power_types = [], []
+        for card in cards:
+            tool = card.tool
+            if tool in tools:
+                raise ValueError(f"Not a legal hand of at most {self.max_tools} distinct tools: {[card.tool.value for card in cards]}")
+            tools.append(tool)
+            base += card.points_value
+            if tool in suggested:
+                hits += 1
+            if card.power_type not in power_types:
+                power_types.append(card.power_type)
+        synergy = 0
+        for threshold, bonus in self.synergy_tiers:
+            if hits >= threshold:
+                synergy += bonus
+        variety = 0
+        for threshold, bonus in self.variety_tiers:
+            if len(power_types) >= threshold:
+                variety += bonus
+        effects = carry_in
+        if rules.solo:
+            for tool in tools:
+                effects += rules.solo.get(tool, 0)
+        if rules.combos:
+            played = set(tools)
+            for needs, bonus in rules.combos:
+                if needs <= played:
+                    effects += bonus
+        carry = 0
+        if self.carry_by_tool:
+            for tool in tools:
+                carry += self.carry_by_tool.get(tool, 0)
+        return _new_score(Score, (base, synergy, variety, effects, base + synergy + variety + effects, carry))
+
+    def earns_token(self, total: int) -> bool:
+        return total >= self.token_threshold
@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models import ToolCard, ScenarioCard
+from game import GameState
+from rules import MAX_TOOLS_PER_TURN, Rule, RuleSet
+
+class BatchScorer(RuleSet):
+    """Array form of ``calculate_points`` for scoring many hands at once.
+
+    Tools, scenarios and rules default to the shared catalog's.
+    """
+
+    def __init__(self, tools: Optional[Sequence[ToolCard]] = None, scenarios: Optional[Sequence[ScenarioCard]] = None, max_tools: int = MAX_TOOLS_PER_TURN, rules: Optional[Sequence[Rule]] = None):
+        catalog = GameState.CATALOG
+        super().__init__(
+            catalog.tools if tools is None else tools,
+            catalog.scenarios if scenarios is None else scenarios,
+            catalog.rules if rules is None else rules,
+            max_tools,
+        )
+
+@dataclass(frozen=True)
+class PlayScore:
+    scenario_index: int
+    tool_indices: Tuple[int, ...]
+    base: int
+    synergy: int
+    variety: int
+    effects: int
+    total: int
+    earns_token: bool
+
+def hand_mask(tool_indices: Sequence[int]) -> int:
+    mask = 0
+    for i in tool_indices:
+        mask |= 1 << i
+    return mask
+
+class PlayIndex:
+    """Every legal play of a scenario, scored and ranked the first time the scenario is asked about.
+
+    ``lookup`` is a single array read. ``best_plays`` filters the
+    scenario's whole ranking (every legal hand) down to hands containing
+    the tools already picked, a vectorised O(combos) mask test per query,
+    and returns the first k. A bonus carried over from the player's
+    previous play adds the same amount to every hand, so it is applied at
+    lookup and leaves the ranking unchanged.
+    """
+
+    def __init__(self, scorer: Optional[RuleSet] = None):
+        self.scorer = scorer or BatchScorer()
+        self.combos = self.scorer.combos
+        self.scenario_lookup = self.scorer.scenario_lookup
+        self.masks = np.array([hand_mask(combo) for combo in self.combos], dtype=np.int64)
+        self._ranked: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def lookup(self, scenario_index: int, mask: int, carry_in: int = 0) -> PlayScore:
+        combo = self.scorer.combo_at_mask.get(mask)
+        if combo is None:
+            raise KeyError(f"No legal play has tool mask {mask:#x}")
+        return self._play(scenario_index, combo, carry_in)
+
+    def best_plays(self, scenario_index: int, picked: Sequence[int] = (), k: int = 3, carry_in: int = 0) -> List[PlayScore]:
+        order, ordered_masks = self._ranking(scenario_index)
+        partial_mask = hand_mask(picked)
+        if partial_mask:
+            order = order[ordered_masks & partial_mask == partial_mask]
+        return [self._play(scenario_index, int(combo), carry_in) for combo in order[:k]]
+
+    def _ranking(self, scenario_index: int) -> Tuple[np.ndarray, np.ndarray]:
+        ranked = self._ranked.get(scenario_index)
+        if ranked is None:
+            # Highest total first; ties keep the smaller hand, as it costs fewer picks.
+            order = np.argsort(-self.scorer.scenario_rows(scenario_index)[:, 4], kind="stable")
+            ranked = self._ranked[scenario_index] = (order, self.masks[order])
+        return ranked
+
+    def _play(self, scenario_index: int, combo: int, carry_in: int = 0) -> PlayScore:
+        base, synergy, variety, effects, total, _ = self.scorer.scenario_rows(scenario_index)[combo].tolist()
+        total += carry_in
+        return PlayScore(scenario_index, self.combos[combo], base, synergy, variety, effects + carry_in, total, self.scorer.earns_token(total))
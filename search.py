@@ -0,0 +1,175 @@
+"""Full-text search over player reflections from every game.
+
+Each ``add_reflection`` event becomes one row in ``reflections`` with its
+game, player, round, scenario and prompt, plus one ``reflection_tools``
+row per tool played that turn, and its text is added to an FTS5 index.
+Like ``analytics``, the rows are written by the event store's writer
+thread in the same transaction as the events, so a search never has to
+scan the log.
+"""
+import json
+import re
+import sqlite3
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reflections (
+    id INTEGER PRIMARY KEY,
+    game_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    player INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    round INTEGER NOT NULL,
+    scenario TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    reflection TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (game_id, seq)
+);
+CREATE INDEX IF NOT EXISTS reflections_by_scenario ON reflections (scenario, created_at);
+CREATE INDEX IF NOT EXISTS reflections_by_prompt ON reflections (prompt, created_at);
+CREATE INDEX IF NOT EXISTS reflections_by_time ON reflections (created_at);
+CREATE TABLE IF NOT EXISTS reflection_tools (
+    tool TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    PRIMARY KEY (tool, id)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS reflections_fts USING fts5(
+    reflection, content='reflections', content_rowid='id', tokenize='porter unicode61'
+);
+"""
+
+Event = Tuple[str, int, str, Dict[str, Any], float]
+
+FTS_SYNTAX = re.compile(r'["*()]|\b(?:AND|OR|NOT|NEAR)\b')
+
+@dataclass(frozen=True)
+class ReflectionHit:
+    game_id: str
+    name: str
+    round: int
+    scenario: str
+    prompt: str
+    tools: List[str]
+    reflection: str
+    snippet: str
+    created_at: float
+
+def _turn_context(conn, game_id: str, seq: int, player: int) -> Tuple[str, List[str]]:
+    """Player name from the game's start event and the tools from the turn the reflection follows."""
+    start = conn.execute("SELECT payload FROM events WHERE game_id = ? AND seq = 1", (game_id,)).fetchone()
+    names = json.loads(start[0])["players"] if start else []
+    turn = conn.execute(
+        "SELECT payload FROM events WHERE game_id = ? AND seq < ? AND kind = 'add_round_score' ORDER BY seq DESC LIMIT 1",
+        (game_id, seq),
+    ).fetchone()
+    tools = json.loads(turn[0])["tools"] if turn else []
+    return names[player] if player < len(names) else f"Player {player + 1}", tools
+
+def fold(conn, events: Iterable[Event]) -> None:
+    """Index the reflections in a batch of events already inserted into ``events``."""
+    for game_id, seq, kind, payload, created_at in events:
+        if kind != "add_reflection":
+            continue
+        name, tools = _turn_context(conn, game_id, seq, payload["player"])
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO reflections (game_id, seq, player, name, round, scenario, prompt, reflection, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (game_id, seq, payload["player"], name, payload["round"], payload["scenario"], payload.get("prompt") or "",
+             payload["reflection"], created_at),
+        )
+        if not cursor.rowcount:
+            continue
+        row_id = cursor.lastrowid
+        conn.execute("INSERT INTO reflections_fts (rowid, reflection) VALUES (?, ?)", (row_id, payload["reflection"]))
+        conn.executemany("INSERT OR IGNORE INTO reflection_tools VALUES (?, ?)", [(tool, row_id) for tool in tools])
+
+def rebuild(conn, chunk_size: int = 10_000) -> None:
+    """Index every reflection in the event log, for databases that predate the index."""
+    conn.execute("DELETE FROM reflection_tools")
+    conn.execute("DELETE FROM reflections")
+    conn.execute("INSERT INTO reflections_fts (reflections_fts) VALUES ('delete-all')")
+    cursor = conn.execute("SELECT game_id, seq, kind, payload, created_at FROM events WHERE kind = 'add_reflection'")
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        fold(conn, [(game_id, seq, kind, json.loads(payload), created_at) for game_id, seq, kind, payload, created_at in rows])
+
+def quote_terms(query: str) -> str:
+    """``query`` with every whitespace-separated term quoted as an FTS5 string, so punctuation is just text."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+def match_queries(query: str) -> List[str]:
+    """MATCH expressions to try for ``query``: the FTS5 syntax as typed when it uses operators, quotes,
+    parentheses or ``*``, then every term quoted as a fallback for queries that don't parse."""
+    quoted = quote_terms(query)
+    return [query, quoted] if FTS_SYNTAX.search(query) else [quoted]
+
+def ensure_schema(conn) -> None:
+    conn.executescript(SCHEMA)
+    has_events = conn.execute("SELECT 1 FROM events WHERE kind = 'add_reflection' LIMIT 1").fetchone()
+    has_rows = conn.execute("SELECT 1 FROM reflections LIMIT 1").fetchone()
+    if has_events and not has_rows:
+        with conn:
+            rebuild(conn)
+
+class ReflectionSearch:
+    """Keyword and phrase queries over the reflections indexed by an ``EventStore``."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def search(self, query: str = "", scenario: Optional[str] = None, tool: Optional[str] = None,
+               prompt: Optional[str] = None, limit: int = 50) -> List[ReflectionHit]:
+        """Best matches for ``query``, or the newest reflections when it is empty, optionally filtered by
+        scenario, tool or prompt. Plain words match as typed, punctuation and all; FTS5 syntax ("quoted
+        phrases", OR, NOT, prefix*) is used when the query contains it."""
+        where, args = [], []
+        if query.strip():
+            sql = ("SELECT r.id, r.game_id, r.name, r.round, r.scenario, r.prompt, r.reflection, "
+                   "snippet(reflections_fts, 0, '**', '**', '…', 12), r.created_at "
+                   "FROM reflections_fts JOIN reflections r ON r.id = reflections_fts.rowid")
+            where.append("reflections_fts MATCH ?")
+            args.append(None)
+            order = "reflections_fts.rank"
+        else:
+            sql = ("SELECT r.id, r.game_id, r.name, r.round, r.scenario, r.prompt, r.reflection, r.reflection, r.created_at "
+                   "FROM reflections r")
+            order = "r.created_at DESC"
+        if scenario:
+            where.append("r.scenario = ?")
+            args.append(scenario)
+        if prompt:
+            where.append("r.prompt = ?")
+            args.append(prompt)
+        if tool:
+            where.append("r.id IN (SELECT id FROM reflection_tools WHERE tool = ?)")
+            args.append(tool)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order} LIMIT ?"
+        args.append(limit)
+
+        self.store.flush(timeout=1.0)
+        with closing(self.store.connect()) as conn:
+            for match in match_queries(query) if query.strip() else [None]:
+                if match is not None:
+                    args[0] = match
+                try:
+                    rows = conn.execute(sql, args).fetchall()
+                    break
+                except sqlite3.OperationalError as e:
+                    error = e
+            else:
+                raise ValueError(f"Invalid search query: {query}") from error
+            tools: Dict[int, List[str]] = {}
+            if rows:
+                ids = [row[0] for row in rows]
+                marks = ", ".join("?" * len(ids))
+                for tool_name, row_id in conn.execute(f"SELECT tool, id FROM reflection_tools WHERE id IN ({marks})", ids):
+                    tools.setdefault(row_id, []).append(tool_name)
+        return [ReflectionHit(game_id, name, round_, scenario_, prompt_, sorted(tools.get(row_id, [])), text, snippet, created_at)
+                for row_id, game_id, name, round_, scenario_, prompt_, text, snippet, created_at in rows]
@@ -0,0 +1,194 @@
+"""Monte Carlo tournaments of The Strategy Shuffle, played by bots.
+
+    python simulate.py --games 1000000 --players 2-4 --rounds 5 \
+        --policies random greedy-synergy power-type-diverse
+
+Games are played through GameEngine with the real scoring rules, split
+into seeded chunks and spread across a process pool. Aggregate stats are
+printed as chunks complete. ``--tool-weights "Team Building=3" Might=0.5``
+deals scenarios that suggest those tools more or less often.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from models import PowerType, Tool, ToolCard, ScenarioCard
+from deck import Weight, by_suggested_tool
+from game import GameEngine, GameState
+from rules import MAX_TOOLS_PER_TURN
+
+Policy = Callable[[random.Random, ScenarioCard], List[ToolCard]]
+
+TOOLS_BY_POWER_TYPE = {p: [t for t in GameState.TOOLS if t.power_type is p] for p in PowerType}
+
+def random_policy(rng: random.Random, scenario: ScenarioCard) -> List[ToolCard]:
+    return rng.sample(GameState.TOOLS, rng.randint(1, MAX_TOOLS_PER_TURN))
+
+def greedy_synergy_policy(rng: random.Random, scenario: ScenarioCard) -> List[ToolCard]:
+    by_points = sorted(GameState.TOOLS, key=lambda t: (t.tool not in scenario.suggested_tools, -t.points_value, rng.random()))
+    return by_points[:MAX_TOOLS_PER_TURN]
+
+def power_type_diverse_policy(rng: random.Random, scenario: ScenarioCard) -> List[ToolCard]:
+    return [rng.choice(TOOLS_BY_POWER_TYPE[p]) for p in PowerType][:MAX_TOOLS_PER_TURN]
+
+POLICIES: Dict[str, Policy] = {
+    "random": random_policy,
+    "greedy-synergy": greedy_synergy_policy,
+    "power-type-diverse": power_type_diverse_policy,
+}
+
+@dataclass
+class SimStats:
+    games: int = 0
+    turns: int = 0
+    tokens: int = 0
+    ties: int = 0
+    token_decided: int = 0
+    final_scores: Counter = field(default_factory=Counter)
+    margins: Counter = field(default_factory=Counter)
+    token_bonus_share: float = 0.0
+    policy_seats: Counter = field(default_factory=Counter)
+    policy_wins: Counter = field(default_factory=Counter)
+
+    def merge(self, other: "SimStats") -> "SimStats":
+        self.games += other.games
+        self.turns += other.turns
+        self.tokens += other.tokens
+        self.ties += other.ties
+        self.token_decided += other.token_decided
+        self.final_scores.update(other.final_scores)
+        self.margins.update(other.margins)
+        self.token_bonus_share += other.token_bonus_share
+        self.policy_seats.update(other.policy_seats)
+        self.policy_wins.update(other.policy_wins)
+        return self
+
+def play_game(rng: random.Random, num_players: int, num_rounds: int, policies: Sequence[str], stats: SimStats, store=None, scenario_weight: Optional[Weight] = None) -> None:
+    engine = GameEngine(seed=rng.getrandbits(64), scenario_weight=scenario_weight, store=store)
+    seats = [policies[i % len(policies)] for i in range(num_players)]
+    state = engine.start([f"{seat} {i + 1}" for i, seat in enumerate(seats)], num_rounds)
+    while not state.game_over:
+        policy = POLICIES[seats[state.current_player_index]]
+        engine.play_turn(state.current_player, policy(rng, state.current_scenario))
+        engine.advance()
+
+    finals = [p.get_final_score() for p in state.players]
+    stats.games += 1
+    stats.turns += num_players * num_rounds
+    for p, final in zip(state.players, finals):
+        stats.tokens += p.get_token_count()
+        stats.final_scores[final] += 1
+        if final:
+            stats.token_bonus_share += (final - p.get_total_points()) / final
+    for seat in seats:
+        stats.policy_seats[seat] += 1
+
+    best = max(finals)
+    winners = [i for i, final in enumerate(finals) if final == best]
+    if len(winners) > 1:
+        stats.ties += 1
+    for i in winners:
+        stats.policy_wins[seats[i]] += 1
+    if num_players > 1:
+        stats.margins[best - sorted(finals)[-2]] += 1
+        base = [p.get_total_points() for p in state.players]
+        if base.index(max(base)) not in winners:
+            stats.token_decided += 1
+
+def chunk_seed(seed: int, chunk: int) -> int:
+    """Seed for one chunk of a run, unrelated to the chunks of any other ``--seed``."""
+    return random.Random(f"{seed}:{chunk}").getrandbits(64)
+
+def run_chunk(seed: int, games: int, players: Sequence[int], rounds: Sequence[int], policies: Sequence[str], tool_weights: Optional[Dict[Tool, float]] = None) -> SimStats:
+    rng = random.Random(seed)
+    stats = SimStats()
+    # Built here rather than passed in, as the weight function doesn't pickle.
+    weight = by_suggested_tool(tool_weights) if tool_weights else None
+    for _ in range(games):
+        play_game(rng, rng.choice(players), rng.choice(rounds), policies, stats, scenario_weight=weight)
+    return stats
+
+def percentile(hist: Counter, q: float) -> int:
+    total = sum(hist.values())
+    if not total:
+        return 0
+    target, running = q * total, 0
+    for value in sorted(hist):
+        running += hist[value]
+        if running >= target:
+            return value
+    return max(hist)
+
+def format_stats(stats: SimStats, elapsed: float) -> str:
+    seats = sum(stats.final_scores.values())
+    mean = sum(v * n for v, n in stats.final_scores.items()) / max(seats, 1)
+    contested = sum(stats.margins.values())
+    lines = [
+        f"games: {stats.games:,}  turns: {stats.turns:,}  ({stats.games / max(elapsed, 1e-9):,.0f} games/s)",
+        f"final score: mean {mean:.2f}  p5 {percentile(stats.final_scores, 0.05)}  p50 {percentile(stats.final_scores, 0.5)}  p95 {percentile(stats.final_scores, 0.95)}  max {max(stats.final_scores, default=0)}",
+        f"tokens per turn: {stats.tokens / max(stats.turns, 1):.3f}  token bonus share of final score: {stats.token_bonus_share / max(seats, 1):.1%}",
+    ]
+    if contested:
+        lines.append(
+            f"winner margin: p50 {percentile(stats.margins, 0.5)}  p95 {percentile(stats.margins, 0.95)}  "
+            f"ties {stats.ties / stats.games:.1%}  decided by token bonus {stats.token_decided / contested:.1%}"
+        )
+    lines.append("win rate per seat: " + "  ".join(
+        f"{policy} {stats.policy_wins[policy] / stats.policy_seats[policy]:.1%}" for policy in sorted(stats.policy_seats)
+    ))
+    return "\n".join(lines)
+
+def parse_range(text: str, low: int, high: int) -> List[int]:
+    start, _, end = text.partition("-")
+    values = list(range(int(start), int(end or start) + 1))
+    if not values or values[0] < low or values[-1] > high:
+        raise argparse.ArgumentTypeError(f"{text!r} must be within {low}-{high}")
+    return values
+
+def parse_tool_weight(text: str) -> Tuple[Tool, float]:
+    name, _, value = text.rpartition("=")
+    try:
+        weight = float(value)
+        tool = Tool(name)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{text!r} is not TOOL=WEIGHT with a known tool") from None
+    if weight < 0:
+        raise argparse.ArgumentTypeError(f"{text!r} has a negative weight")
+    return tool, weight
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--players", type=lambda s: parse_range(s, 1, 6), default=[2], help="player count or range, e.g. 2-4")
+    parser.add_argument("--rounds", type=lambda s: parse_range(s, 1, 9), default=[5], help="round count or range, e.g. 3-9")
+    parser.add_argument("--policies", nargs="+", choices=sorted(POLICIES), default=["random"], help="bot policies, assigned to seats in turn")
+    parser.add_argument("--tool-weights", nargs="+", type=parse_tool_weight, default=[], metavar="TOOL=WEIGHT",
+                        help="deal scenarios suggesting these tools more (or, at 0, less) often; other tools weigh 1")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report-every", type=float, default=5.0, help="seconds between progress reports")
+    args = parser.parse_args(argv)
+
+    chunks = [(chunk_seed(args.seed, i), min(args.chunk_size, args.games - start)) for i, start in enumerate(range(0, args.games, args.chunk_size))]
+    totals = SimStats()
+    started = last_report = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(run_chunk, seed, games, args.players, args.rounds, args.policies, dict(args.tool_weights)) for seed, games in chunks]
+        for future in as_completed(futures):
+            totals.merge(future.result())
+            now = time.perf_counter()
+            if now - last_report >= args.report_every and totals.games < args.games:
+                print(format_stats(totals, now - started), end="\n\n", file=sys.stderr, flush=True)
+                last_report = now
+    print(format_stats(totals, time.perf_counter() - started))
+    return totals
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""Append-only SQLite log of game transitions.
+
+Every engine transition becomes one row in ``events``. Rows are queued
+by the caller and written by a background thread that group-commits
+batches, so recording never waits on disk. A snapshot of the whole game
+is stored every ``snapshot_every`` events at a turn boundary, and
+``replay`` starts from the latest snapshot instead of the first event.
+A batch that fails to commit is retried a few times and then dropped
+with a logged error, so the writer never stops and flushes never hang.
+The writer also folds each batch into the aggregates in ``analytics`` and
+the reflection index in ``search``.
+"""
+import json
+import logging
+import os
+from collections import OrderedDict
+from contextlib import closing
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import analytics
+import search
+from models import Player
+
+log = logging.getLogger(__name__)
+
+DEFAULT_DB = Path(os.environ.get("STRATEGY_SHUFFLE_DB", Path(__file__).resolve().parent / ".data" / "games.sqlite3"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    game_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (game_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS snapshots (
+    game_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (game_id, seq)
+) WITHOUT ROWID;
+"""
+
+@dataclass
+class Replay:
+    """Game position rebuilt from the log."""
+    game_id: str
+    seq: int = 0
+    players: List[Player] = field(default_factory=list)
+    max_rounds: int = 0
+    current_round: int = 0
+    current_player_index: int = 0
+    scenario: str = ""
+    dealt: List[str] = field(default_factory=list)
+    cycle: int = 0
+    last_turn: Optional[Dict[str, Any]] = None
+    game_over: bool = False
+
+    def apply(self, seq: int, kind: str, payload: Dict[str, Any]) -> None:
+        if kind == "start":
+            self.players = [Player(name) for name in payload["players"]]
+            self.max_rounds = payload["max_rounds"]
+            self.current_round, self.current_player_index = 1, 0
+            self.dealt, self.cycle = [], payload["cycle"]
+            self._deal(payload["scenario"], payload["cycle"])
+        elif kind == "add_round_score":
+            player = self.players[payload["player"]]
+            player.add_round_score(payload["total"])
+            player.carry_bonus = payload.get("carry", 0)
+            self.last_turn = payload
+        elif kind == "add_token":
+            self.players[payload["player"]].add_token(payload["token"])
+        elif kind == "add_reflection":
+            self.players[payload["player"]].add_reflection(payload["reflection"])
+        elif kind == "advance":
+            self.current_round = payload["round"]
+            self.current_player_index = payload["player"]
+            self.game_over = payload["game_over"]
+            self.last_turn = None
+            if payload["scenario"] != self.scenario or payload["cycle"] != self.cycle:
+                self._deal(payload["scenario"], payload["cycle"])
+        self.seq = seq
+
+    def _deal(self, scenario: str, cycle: int) -> None:
+        if cycle != self.cycle:
+            self.dealt, self.cycle = [], cycle
+        self.scenario = scenario
+        self.dealt.append(scenario)
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "players": [[p.name, p.tokens, p.round_scores.tolist(), p.reflections, p.carry_bonus] for p in self.players],
+            "max_rounds": self.max_rounds,
+            "current_round": self.current_round,
+            "current_player_index": self.current_player_index,
+            "scenario": self.scenario,
+            "dealt": self.dealt,
+            "cycle": self.cycle,
+            "game_over": self.game_over,
+        })
+
+    @classmethod
+    def from_json(cls, game_id: str, seq: int, text: str) -> "Replay":
+        data = json.loads(text)
+        players = []
+        for name, tokens, scores, reflections, *carry in data.pop("players"):
+            player = Player(name, carry_bonus=carry[0] if carry else 0)
+            for score in scores:
+                player.add_round_score(score)
+            for token in tokens:
+                player.add_token(token)
+            player.reflections.extend(reflections)
+            players.append(player)
+        return cls(game_id, seq, players, **data)
+
+    @classmethod
+    def from_state(cls, state) -> "Replay":
+        deck, scenarios = state.deck, state.catalog.scenarios
+        return cls(
+            game_id=state.game_id,
+            players=state.players,
+            max_rounds=state.max_rounds,
+            current_round=state.current_round,
+            current_player_index=state.current_player_index,
+            scenario=state.current_scenario.name,
+            dealt=[scenarios[i].name for i in deck.dealt],
+            cycle=deck.cycles,
+            game_over=state.game_over,
+        )
+
+_FLUSH = object()
+_STOP = object()
+
+class EventStore:
+    def __init__(self, path=DEFAULT_DB, batch_size: int = 256, flush_interval: float = 0.05, snapshot_every: int = 50,
+                 flush_timeout: float = 5.0, retries: int = 3, max_open_games: int = 10_000):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self.flush_timeout = flush_timeout
+        self.retries = retries
+        self.max_open_games = max_open_games
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self.connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            analytics.ensure_schema(conn)
+            search.ensure_schema(conn)
+        self.lock = threading.Lock()
+        # game_id -> [last seq, last snapshot seq] for games still being played, least recently used first.
+        self.open_games: "OrderedDict[str, List[int]]" = OrderedDict()
+        self.queue: "queue.Queue" = queue.Queue()
+        self.writer = threading.Thread(target=self._write_loop, name="event-store-writer", daemon=True)
+        self.writer.start()
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def append(self, state, kind: str, payload: Dict[str, Any]) -> int:
+        """Queue one event for ``state.game_id`` and return its sequence number."""
+        game_id = state.game_id
+        with self.lock:
+            known = game_id in self.open_games
+        # A game evicted from open_games picks up where the log left off; a new game starts at 1.
+        logged = self._logged_seqs(game_id) if not known and kind != "start" else [0, 0]
+        with self.lock:
+            counters = self.open_games.setdefault(game_id, logged)
+            self.open_games.move_to_end(game_id)
+            counters[0] += 1
+            seq = counters[0]
+            snapshot = None
+            if kind == "advance" and seq - counters[1] >= self.snapshot_every:
+                counters[1] = seq
+                snapshot = Replay.from_state(state)
+            if payload.get("game_over"):
+                del self.open_games[game_id]
+            elif len(self.open_games) > self.max_open_games:
+                self.open_games.popitem(last=False)
+        self.queue.put(("event", ((game_id, seq, kind, json.dumps(payload), time.time()), payload)))
+        if snapshot is not None:
+            self.queue.put(("snapshot", (game_id, seq, snapshot.to_json())))
+        return seq
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued so far is committed or dropped, for at most
+        ``timeout`` seconds (``flush_timeout`` by default). Returns whether it finished."""
+        done = threading.Event()
+        self.queue.put((_FLUSH, done))
+        if done.wait(self.flush_timeout if timeout is None else timeout):
+            return True
+        log.warning("Event store flush timed out; reading possibly stale data")
+        return False
+
+    def close(self) -> None:
+        self.queue.put((_STOP, None))
+        self.writer.join()
+
+    def replay(self, game_id: str) -> Optional[Replay]:
+        self.flush()
+        with closing(self.connect()) as conn:
+            row = conn.execute("SELECT seq, state FROM snapshots WHERE game_id = ? ORDER BY seq DESC LIMIT 1", (game_id,)).fetchone()
+            replay = Replay.from_json(game_id, *row) if row else Replay(game_id)
+            events = conn.execute("SELECT seq, kind, payload FROM events WHERE game_id = ? AND seq > ? ORDER BY seq", (game_id, replay.seq))
+            for seq, kind, payload in events:
+                replay.apply(seq, kind, json.loads(payload))
+        if not replay.seq:
+            return None
+        if not replay.game_over:
+            with self.lock:
+                counters = self.open_games.setdefault(game_id, [0, row[0] if row else 0])
+                counters[0] = max(counters[0], replay.seq)
+                self.open_games.move_to_end(game_id)
+        return replay
+
+    def events(self, game_id: Optional[str] = None) -> Iterator[Tuple[str, int, str, Dict[str, Any]]]:
+        self.flush()
+        query = "SELECT game_id, seq, kind, payload FROM events"
+        args: tuple = ()
+        if game_id is not None:
+            query, args = query + " WHERE game_id = ?", (game_id,)
+        with closing(self.connect()) as conn:
+            for game, seq, kind, payload in conn.execute(query + " ORDER BY game_id, seq", args):
+                yield game, seq, kind, json.loads(payload)
+
+    def _logged_seqs(self, game_id: str) -> List[int]:
+        self.flush()
+        with closing(self.connect()) as conn:
+            seq = conn.execute("SELECT MAX(seq) FROM events WHERE game_id = ?", (game_id,)).fetchone()[0]
+            snapshot = conn.execute("SELECT MAX(seq) FROM snapshots WHERE game_id = ?", (game_id,)).fetchone()[0]
+        return [seq or 0, snapshot or 0]
+
+    def _commit(self, conn: sqlite3.Connection, batch: List[Tuple[str, Any]]) -> None:
+        events = [item for k, item in batch if k == "event"]
+        folded = [(game_id, seq, kind, payload, created_at) for (game_id, seq, kind, _, created_at), payload in events]
+        for attempt in range(self.retries + 1):
+            try:
+                with conn:
+                    conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?)", [row for row, payload in events])
+                    conn.executemany("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)", [row for k, row in batch if k == "snapshot"])
+                    analytics.fold(conn, folded)
+                    search.fold(conn, folded)
+                return
+            except sqlite3.OperationalError as e:
+                if attempt == self.retries:
+                    log.error("Dropping %d events after %d attempts: %s", len(events), attempt + 1, e)
+                    return
+                log.warning("Event batch failed, retrying: %s", e)
+                time.sleep(0.1 * 2 ** attempt)
+            except Exception:
+                log.exception("Dropping %d events", len(events))
+                return
+
+    def _write_loop(self) -> None:
+        conn = self.connect()
+        running = True
+        while running:
+            kind, item = self.queue.get()
+            batch, waiters = [], []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if kind is _STOP:
+                    running = False
+                elif kind is _FLUSH:
+                    waiters.append(item)
+                else:
+                    batch.append((kind, item))
+                if not running or waiters or len(batch) >= self.batch_size:
+                    break
+                try:
+                    kind, item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            try:
+                if batch:
+                    self._commit(conn, batch)
+            finally:
+                for done in waiters:
+                    done.set()
+        conn.close()
@@ -0,0 +1,72 @@
+import json
+import os
+import shutil
+
+import pytest
+
+import catalog
+from catalog import DEFAULT_PACK, CatalogError, CatalogLoader, load_catalog
+from models import Tool
+
+@pytest.fixture
+def pack(tmp_path, monkeypatch):
+    """A writable copy of the default pack, with the compiled cache kept under tmp_path."""
+    monkeypatch.setattr(catalog, "CACHE_DIR", tmp_path / "cache")
+    return shutil.copytree(DEFAULT_PACK, tmp_path / "pack")
+
+def edit(path, change):
+    rows = json.loads(path.read_text(encoding="utf-8"))
+    change(rows)
+    path.write_text(json.dumps(rows), encoding="utf-8")
+
+@pytest.mark.parametrize("section, change, message", [
+    ("tools", lambda rows: rows[0].update(tool="Charisma"), "unknown Tool 'Charisma'"),
+    ("tools", lambda rows: rows[0].update(power_type="Sharp Power"), "unknown PowerType 'Sharp Power'"),
+    ("tools", lambda rows: rows[0].update(points=-1), "'points' must not be negative"),
+    ("tools", lambda rows: rows.pop(0), "suggests tools with no card: Ethos"),
+    ("rules", lambda rows: rows.append({"kind": "bonus"}), "unknown rule kind 'bonus'"),
+])
+def test_invalid_content_is_rejected(pack, section, change, message):
+    edit(pack / f"{section}.json", change)
+    with pytest.raises(CatalogError, match=message):
+        load_catalog([pack], use_cache=False)
+
+def test_csv_lists_are_split_on_semicolons(pack, tmp_path):
+    extra = tmp_path / "extra"
+    extra.mkdir()
+    (extra / "scenarios.csv").write_text(
+        "name,situation,suggested_tools,reward_token,lesson,play_example,difficulty\n"
+        "Town Hall,A tense meeting.,Ethos; Team Building ;,Trust Token,Listen first.,Open the floor.,2\n",
+        encoding="utf-8",
+    )
+    scenario = load_catalog([pack, extra], use_cache=False).scenarios[-1]
+    assert (scenario.name, scenario.suggested_tools, scenario.difficulty) == ("Town Hall", [Tool.ETHOS, Tool("Team Building")], 2)
+
+def test_the_cache_is_rebuilt_when_a_source_file_changes(pack, monkeypatch):
+    compiled = []
+    compile_catalog = catalog.compile_catalog
+    monkeypatch.setattr(catalog, "compile_catalog", lambda *args: compiled.append(1) or compile_catalog(*args))
+    first = load_catalog([pack])
+    assert load_catalog([pack]).fingerprint == first.fingerprint and len(compiled) == 1
+
+    lessons = pack / "lessons.json"
+    stat = lessons.stat()
+    os.utime(lessons, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert load_catalog([pack]).fingerprint != first.fingerprint and len(compiled) == 2
+
+    edit(lessons, lambda rows: rows.append("One more lesson."))
+    assert load_catalog([pack]).lessons[-1] == "One more lesson." and len(compiled) == 3
+
+def test_the_loader_keeps_the_last_good_catalog(pack):
+    loader = CatalogLoader([pack])
+    good = loader.get()
+    tools = pack / "tools.json"
+    original = tools.read_text(encoding="utf-8")
+
+    edit(tools, lambda rows: rows[0].update(points="many"))
+    assert loader.get() is good
+    assert isinstance(loader.error, CatalogError) and "'points' must be an integer" in str(loader.error)
+
+    tools.write_text(original.replace('"points": 2', '"points": 3', 1), encoding="utf-8")
+    fixed = loader.get()
+    assert loader.error is None and fixed is not good and fixed.tools[0].points_value == 3
@@ -0,0 +1,69 @@
+import pytest
+
+from deck import Deck, by_difficulty, by_suggested_tool
+from game import GameState
+from models import Tool
+
+def cycles(deck, n):
+    return [[deck.draw_index() for _ in range(len(deck.cards) if deck.weights is None else sum(w > 0 for w in deck.weights))] for _ in range(n)]
+
+@pytest.mark.parametrize("weight", [None, [3, 1, 1, 2, 1, 1, 1, 5]])
+def test_the_same_seed_deals_the_same_cycles(weight):
+    assert cycles(Deck(range(8), seed=5, weight=weight), 4) == cycles(Deck(range(8), seed=5, weight=weight), 4)
+    assert cycles(Deck(range(8), seed=5, weight=weight), 4) != cycles(Deck(range(8), seed=6, weight=weight), 4)
+
+@pytest.mark.parametrize("weight", [None, [3, 1, 1, 2, 1, 1, 1, 5]])
+def test_each_cycle_deals_every_card_once(weight):
+    deck = Deck(range(8), seed=1, weight=weight)
+    for n in range(1, 21):
+        assert sorted(cycles(deck, 1)[0]) == list(range(8))
+        assert deck.cycles == n and len(deck) == 0
+
+@pytest.mark.parametrize("weight", [None, [1] * 6])
+@pytest.mark.parametrize("avoid", [1, 3])
+def test_recent_cards_are_not_repeated_across_a_reshuffle(weight, avoid):
+    for seed in range(50):
+        deck = Deck(range(6), seed=seed, weight=weight, avoid_repeats=avoid)
+        dealt = [card for cycle in cycles(deck, 10) for card in cycle]
+        for i in range(len(dealt) - avoid):
+            window = dealt[i:i + avoid + 1]
+            assert len(set(window)) == len(window), (seed, i, window)
+
+def test_heavier_cards_are_dealt_earlier():
+    deck = Deck(range(4), seed=0, weight=[10, 1, 1, 1], avoid_repeats=0)
+    firsts = [cycle[0] for cycle in cycles(deck, 2000)]
+    # Card 0 leads a cycle with probability 10/13.
+    assert 0.72 < firsts.count(0) / len(firsts) < 0.82
+
+def test_zero_weights_leave_cards_out():
+    deck = Deck(range(5), seed=0, weight=[1, 0, 2, 0, 1])
+    for cycle in cycles(deck, 10):
+        assert sorted(cycle) == [0, 2, 4]
+    with pytest.raises(ValueError):
+        Deck(range(3), weight=[0, 0, 0])
+    with pytest.raises(ValueError):
+        Deck(range(3), weight=[1, 1])
+
+@pytest.mark.parametrize("weight", [None, [2, 1, 1, 1, 3, 1, 1, 1, 1, 1]])
+def test_resume_deals_the_rest_of_the_cycle(weight):
+    for seed in range(30):
+        original = Deck(range(10), seed=seed, weight=weight)
+        original.draw_index()
+        original.reshuffle()
+        dealt = [original.draw_index() for _ in range(seed % 10)]
+        resumed = Deck(range(10), seed=seed + 100, weight=weight)
+        resumed.resume(dealt, original.cycles)
+        assert (len(resumed), resumed.cycles, resumed.dealt) == (10 - len(dealt), 2, dealt)
+        rest = [resumed.draw_index() for _ in range(10 - len(dealt))]
+        assert sorted(dealt + rest) == list(range(10)) and resumed.dealt == dealt + rest
+        resumed.draw_index()
+        assert resumed.cycles == 3
+
+def test_weight_helpers():
+    scenario = GameState.SCENARIOS[0]
+    assert by_difficulty({scenario.difficulty: 4.0})(scenario) == 4.0
+    assert by_difficulty({}, default=2.0)(scenario) == 2.0
+    tools = scenario.suggested_tools
+    weight = by_suggested_tool({tools[0]: 1 + len(tools)})
+    assert weight(scenario) == pytest.approx(2.0)
+    assert by_suggested_tool({t: 0.0 for t in Tool})(scenario) == 0.0
@@ -0,0 +1,13 @@
+import csv
+import io
+
+import export
+
+def test_export_stops_at_the_limit():
+    events = list(export.simulated_events(5, [2], [3], ["random"], seed=1))
+    out = io.StringIO()
+    assert export.export(events, out, "csv") == 30
+    limited = io.StringIO()
+    assert export.export(iter(events), limited, "csv", chunk_size=4, limit=7) == 7
+    rows = list(csv.reader(io.StringIO(limited.getvalue())))
+    assert rows[0] == list(export.COLUMNS) and rows[1:] == list(csv.reader(io.StringIO(out.getvalue())))[1:8]
@@ -0,0 +1,84 @@
+import pytest
+
+from game import GameEngine, GameError, GameState, calculate_points
+
+TOOLS = GameState.TOOLS
+
+def test_a_game_runs_every_player_through_every_round():
+    engine = GameEngine(seed=3)
+    state = engine.start(["Ada", "Ben"], 2)
+    assert (state.current_round, state.current_player_index, state.game_started) == (1, 0, True)
+    scenarios, turns = [], []
+    for expected_round, expected_player in [(1, 0), (1, 1), (2, 0), (2, 1)]:
+        assert (state.current_round, state.current_player_index) == (expected_round, expected_player)
+        scenarios.append(state.current_scenario)
+        player = state.current_player
+        turn = engine.play_turn(player, TOOLS[:3])
+        assert turn.total == calculate_points(TOOLS[:3], state.current_scenario).total
+        assert state.turn_scored and state.reflection_prompt
+        engine.submit_reflection(f"reflection {len(turns)}")
+        turns.append(turn)
+        engine.advance()
+        assert not state.turn_scored and state.reflection_prompt is None
+
+    assert state.game_over
+    assert scenarios[0] is scenarios[1] and scenarios[2] is scenarios[3] and scenarios[0] is not scenarios[2]
+    ada, ben = state.players
+    assert list(ada.round_scores) == [turns[0].total, turns[2].total]
+    assert ada.reflections == ["reflection 0", "reflection 2"] and ben.reflections == ["reflection 1", "reflection 3"]
+    assert ada.get_final_score() == sum(ada.round_scores) + 5 * ada.get_token_count()
+    with pytest.raises(GameError):
+        engine.play_turn(ada, TOOLS[:1])
+
+def test_an_empty_reflection_is_not_recorded():
+    engine = GameEngine(seed=0)
+    state = engine.start(["Solo"], 1)
+    engine.play_turn(state.current_player, TOOLS[:1])
+    engine.submit_reflection("")
+    assert state.current_player.reflections == []
+
+def test_the_same_seed_deals_the_same_game():
+    def dealt(seed):
+        engine = GameEngine(seed=seed)
+        state = engine.start(["Solo"], 5)
+        names = []
+        while not state.game_over:
+            names.append(state.current_scenario.name)
+            engine.play_turn(state.current_player, TOOLS[:1])
+            engine.advance()
+        return names
+    assert dealt(7) == dealt(7)
+
+@pytest.mark.parametrize("players, rounds", [([], 3), (["Solo"], 0)])
+def test_start_rejects_an_empty_game(players, rounds):
+    with pytest.raises(GameError):
+        GameEngine().start(players, rounds)
+
+def test_turn_rules_are_enforced():
+    engine = GameEngine(seed=0)
+    state = engine.start(["Ada", "Ben"], 1)
+    ada, ben = state.players
+    for player, tools, message in [
+        (ben, TOOLS[:1], "not Ben's turn"),
+        (ada, [], "at least one tool"),
+        (ada, TOOLS[:4], "at most 3"),
+        (ada, [TOOLS[0], TOOLS[0]], "only be played once"),
+    ]:
+        with pytest.raises(GameError, match=message):
+            engine.play_turn(player, tools)
+    assert not state.turn_scored and ada.round_scores.tolist() == []
+
+    for call in (engine.advance, lambda: engine.submit_reflection("too early")):
+        with pytest.raises(GameError, match="has not played this turn yet"):
+            call()
+    engine.play_turn(ada, TOOLS[:1])
+    with pytest.raises(GameError, match="already played this turn"):
+        engine.play_turn(ada, TOOLS[1:2])
+
+def test_nothing_can_be_played_before_a_game_starts():
+    engine = GameEngine()
+    with pytest.raises(GameError, match="No game in progress"):
+        engine.advance()
+    engine.start(["Solo"], 1)
+    engine.reset()
+    assert not engine.state.game_started
@@ -0,0 +1,15 @@
+import socket
+
+import instrumentation
+
+def test_busy_metrics_port_disables_the_endpoint(monkeypatch, caplog):
+    monkeypatch.setattr(instrumentation, "_server", None)
+    monkeypatch.setattr(instrumentation, "_server_failed", False)
+    with socket.socket() as taken:
+        taken.bind(("127.0.0.1", 0))
+        taken.listen()
+        port = taken.getsockname()[1]
+        instrumentation.serve(port)
+        instrumentation.serve(port)
+    assert instrumentation._server is None
+    assert len([r for r in caplog.records if "Metrics endpoint disabled" in r.message]) == 1
@@ -0,0 +1,51 @@
+from dataclasses import replace
+
+import pytest
+
+from catalog import DEFAULT_PACK, load_catalog
+from rules import Score
+
+EFFECTS_PACK = DEFAULT_PACK.parent / "effects"
+
+def original_points(chosen_tools, scenario):
+    """calculate_points as it was before rules were data."""
+    base_points = sum(tool.points_value for tool in chosen_tools)
+    synergy_bonus = 2 if sum(1 for tool in chosen_tools if tool.tool in scenario.suggested_tools) >= 2 else 0
+    variety_bonus = 1 if len(set(tool.power_type for tool in chosen_tools)) == 3 else 0
+    return base_points, synergy_bonus, variety_bonus, base_points + synergy_bonus + variety_bonus
+
+def test_default_rules_reproduce_the_original_scoring():
+    catalog = load_catalog([DEFAULT_PACK], use_cache=False)
+    rule_set = catalog.rule_set
+    assert {(r.kind, r.threshold, r.bonus) for r in catalog.rules} == {("synergy", 2, 2), ("variety", 3, 1), ("token", 7, 0)}
+    for scenario in catalog.scenarios:
+        for combo in rule_set.combos:
+            cards = [catalog.tools[i] for i in combo]
+            score = rule_set.score_cards(cards, scenario)
+            assert (score.base, score.synergy, score.variety, score.total) == original_points(cards, scenario)
+            assert score.effects == score.carry == 0
+    assert not rule_set.earns_token(6) and rule_set.earns_token(7)
+
+def test_single_hands_match_the_arrays_with_effects():
+    catalog = load_catalog([DEFAULT_PACK, EFFECTS_PACK], use_cache=False)
+    rule_set = catalog.rule_set
+    batch = rule_set.score()
+    columns = (batch.base, batch.synergy, batch.variety, batch.effects, batch.total, batch.carry)
+    pairs = rule_set.score_pairs(rule_set.selections, [1] * len(rule_set.combos), carry_in=2)
+    assert batch.effects.any() and batch.carry.any()
+    for si, scenario in enumerate(catalog.scenarios):
+        rows = rule_set.scenario_rows(si)
+        for c, combo in enumerate(rule_set.combos):
+            expected = Score(*(int(column[si, c]) for column in columns))
+            assert rule_set.score_hand(combo, si) == expected == Score(*rows[c].tolist())
+            # A renamed copy is outside the compiled list and scored from its own fields.
+            assert rule_set.score_cards([catalog.tools[i] for i in combo], replace(scenario, name=f"{scenario.name} copy")) == expected
+            if si == 1:
+                with_carry = rule_set.score_hand(combo, si, carry_in=2)
+                assert (with_carry.effects, with_carry.total) == (int(pairs.effects[c]), int(pairs.total[c]))
+
+@pytest.mark.parametrize("hand", [(0, 0), (0, 1, 2, 3), (-1,), (99,)])
+def test_illegal_hands_are_rejected(hand):
+    rule_set = load_catalog([DEFAULT_PACK], use_cache=False).rule_set
+    with pytest.raises(ValueError):
+        rule_set.score_hand(hand, 0)
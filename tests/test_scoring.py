@@ -0,0 +1,26 @@
+from game import GameState, calculate_points
+from scoring import BatchScorer, PlayIndex, hand_mask
+
+def test_batch_scores_match_calculate_points():
+    scorer = BatchScorer()
+    batch = scorer.score()
+    assert scorer.combos[0] == ()
+    assert batch.total.shape == (len(GameState.SCENARIOS), len(scorer.combos))
+    for si, scenario in enumerate(GameState.SCENARIOS):
+        for c, combo in enumerate(scorer.combos):
+            score = calculate_points([GameState.TOOLS[i] for i in combo], scenario)
+            assert (score.base, score.synergy, score.variety, score.effects, score.total) == (
+                batch.base[si, c], batch.synergy[si, c], batch.variety[si, c], batch.effects[si, c], batch.total[si, c])
+            assert scorer.earns_token(score.total) == batch.earns_token[si, c]
+
+def test_best_plays_are_the_top_hands_containing_the_picks():
+    index = PlayIndex(BatchScorer())
+    for si, scenario in enumerate(GameState.SCENARIOS):
+        for picked in [(), (0,), (2, 5)]:
+            plays = index.best_plays(si, picked, k=3, carry_in=1)
+            candidates = [combo for combo in index.combos if set(picked) <= set(combo)]
+            best = sorted(calculate_points([GameState.TOOLS[i] for i in combo], scenario, 1).total for combo in candidates)[-3:]
+            assert sorted(play.total for play in plays) == best
+            assert all(set(picked) <= set(play.tool_indices) for play in plays)
+            play = plays[0]
+            assert index.lookup(si, hand_mask(play.tool_indices), carry_in=1) == play
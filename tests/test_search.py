@@ -0,0 +1,22 @@
+from game import GameEngine, GameState
+from search import ReflectionSearch
+from store import EventStore
+
+REFLECTIONS = ["I don't interrupt anymore", "The team's goals came first", "Self-awareness helped", "Like debugging C++ code"]
+
+def test_punctuation_is_searched_as_text(tmp_path):
+    store = EventStore(tmp_path / "games.sqlite3")
+    engine = GameEngine(seed=0, store=store)
+    state = engine.start(["Solo"], len(REFLECTIONS))
+    for reflection in REFLECTIONS:
+        engine.play_turn(state.current_player, GameState.TOOLS[:2])
+        engine.submit_reflection(reflection)
+        engine.advance()
+    search = ReflectionSearch(store)
+
+    for query, expected in [("don't", 0), ("team's goals", 1), ("self-awareness", 2), ("C++", 3), ("goals OR debugging", 1),
+                            ('"came first"', 1), ("interrupt*", 0), ("team's (goals", 1)]:
+        hits = search.search(query)
+        assert REFLECTIONS[expected] in [hit.reflection for hit in hits], query
+    assert len(search.search("goals OR debugging")) == 2
+    store.close()
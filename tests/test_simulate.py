@@ -0,0 +1,34 @@
+import argparse
+import random
+
+import pytest
+
+from deck import by_suggested_tool
+from game import GameState
+from models import Tool
+from simulate import SimStats, parse_tool_weight, play_game, run_chunk
+
+class Scenarios:
+    """Store stand-in that keeps the scenario of every recorded event."""
+
+    def __init__(self):
+        self.names = set()
+
+    def append(self, state, kind, payload):
+        self.names.add(payload["scenario"])
+
+def test_tool_weights_steer_the_deal():
+    tool = GameState.SCENARIOS[0].suggested_tools[0]
+    weights = {t: 0.0 for t in Tool}
+    weights[tool] = 1.0
+    scenarios = Scenarios()
+    for seed in range(20):
+        play_game(random.Random(seed), 2, 9, ["random"], SimStats(), store=scenarios, scenario_weight=by_suggested_tool(weights))
+    assert scenarios.names <= {s.name for s in GameState.SCENARIOS if tool in s.suggested_tools}
+    assert run_chunk(1, 20, [2], [3], ["random"], weights).games == 20
+
+def test_parse_tool_weight():
+    assert parse_tool_weight("Team Building=2.5") == (Tool("Team Building"), 2.5)
+    for text in ("Nope=1", "Might", "Might=-1", "Might=x"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_tool_weight(text)
@@ -0,0 +1,77 @@
+import sqlite3
+
+import analytics
+from game import GameEngine, GameState
+from store import EventStore
+
+def play(engine, turns):
+    state = engine.state
+    for _ in range(turns):
+        if state.game_over:
+            break
+        engine.play_turn(state.current_player, GameState.TOOLS[:2])
+        engine.advance()
+
+def test_restore_twice_keeps_the_cycle_dealt_before_each_restore(tmp_path):
+    store = EventStore(tmp_path / "games.sqlite3", snapshot_every=3)
+    rounds = len(GameState.SCENARIOS)
+    for seed in range(30):
+        engine = GameEngine(seed=seed, store=store)
+        game_id = engine.start(["Solo"], rounds).game_id
+        play(engine, 2)
+        for turns in (3, rounds):
+            replay = store.replay(game_id)
+            engine = GameEngine(seed=seed + 1000, store=store)
+            engine.restore(replay)
+            play(engine, turns)
+
+        replay = store.replay(game_id)
+        assert replay.game_over
+        assert replay.cycle == 1
+        assert sorted(replay.dealt) == sorted(s.name for s in GameState.SCENARIOS)
+        dealt = [payload["scenario"] for _, _, kind, payload in store.events(game_id) if kind in ("start", "advance")]
+        assert len(set(dealt)) == rounds
+    store.close()
+
+def test_writer_survives_a_failed_batch(tmp_path, monkeypatch):
+    store = EventStore(tmp_path / "games.sqlite3", retries=1)
+    fold, failures = analytics.fold, []
+
+    def locked_once(conn, events):
+        if not failures:
+            failures.append(1)
+            raise sqlite3.OperationalError("database is locked")
+        fold(conn, events)
+
+    monkeypatch.setattr(analytics, "fold", locked_once)
+    engine = GameEngine(seed=0, store=store)
+    game_id = engine.start(["Solo"], 3).game_id
+    play(engine, 1)
+    assert store.flush()
+    assert failures and store.replay(game_id).current_round == 2
+
+    def always_locked(conn, events):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(analytics, "fold", always_locked)
+    play(engine, 1)
+    assert store.flush()
+    monkeypatch.setattr(analytics, "fold", fold)
+    play(engine, 1)
+    assert store.flush()
+    assert [kind for _, _, kind, _ in store.events(game_id)].count("advance") == 2
+    store.close()
+
+def test_finished_and_evicted_games_are_pruned(tmp_path):
+    store = EventStore(tmp_path / "games.sqlite3", max_open_games=1)
+    first, second = GameEngine(seed=1, store=store), GameEngine(seed=2, store=store)
+    first.start(["A"], 2)
+    second.start(["B"], 2)
+    assert list(store.open_games) == [second.state.game_id]
+    play(first, 2)
+    play(second, 2)
+    assert not store.open_games
+    for engine in (first, second):
+        seqs = [seq for _, seq, _, _ in store.events(engine.state.game_id)]
+        assert seqs == list(range(1, len(seqs) + 1)) and len(seqs) == 5
+    store.close()